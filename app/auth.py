@@ -1,30 +1,92 @@
 
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session 
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from . import schemas, models, crud
-from .database import SessionLocal
+from .cache import MISSING, TTLCache
+from .database import get_db
 
 
 SECRET_KEY = "your_very_secret_key_for_jwt_dev_only" 
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Authenticated users are resolved from this cache (keyed by token subject) before hitting the
+# database. Changes made through the ORM invalidate it in this process; other processes see them
+# within the TTL.
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "4096"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+
+# bcrypt cost factor. Hashes with any other cost are re-hashed on the user's next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt releases the GIL, so a thread pool hashes in parallel without blocking the event loop.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+# Hash/verify jobs allowed to wait for or occupy a worker; beyond that requests get a 503.
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 8)))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 
+# Parsed once: passing the raw secret makes python-jose rebuild the key on every encode/decode.
+_signing_key = jwk.construct(SECRET_KEY, ALGORITHM)
+_user_cache = TTLCache(maxsize=USER_CACHE_MAX_ENTRIES, ttl_seconds=USER_CACHE_TTL_SECONDS)
+
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_pending_password_jobs = 0
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Returns (verified, new_hash); new_hash is set when the stored hash uses another bcrypt cost."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+async def _run_password_job(func, *args):
+    # Only touched from the event loop thread, so the counter needs no lock.
+    global _pending_password_jobs
+    if _pending_password_jobs >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent password operations, please retry",
+            headers={"Retry-After": "1"},
+        )
+    _pending_password_jobs += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_password_executor, func, *args)
+    finally:
+        _pending_password_jobs -= 1
+
+async def hash_password_async(password: str) -> str:
+    return await _run_password_job(get_password_hash, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await _run_password_job(verify_and_update_password, plain_password, hashed_password)
+
+def pending_password_jobs() -> int:
+    return _pending_password_jobs
+
+def shutdown_password_executor() -> None:
+    _password_executor.shutdown(wait=False, cancel_futures=True)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -32,19 +94,38 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, _signing_key, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_db_session() -> Session: 
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def invalidate_cached_user(username: str) -> None:
+    _user_cache.delete(username)
+
+def user_cache_stats() -> dict:
+    return _user_cache.stats()
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_user_on_change(mapper, connection, target: models.User) -> None:
+    invalidate_cached_user(target.username)
+    # After a rename the cached entry lives under the old subject.
+    for old_username in inspect(target).attrs.username.history.deleted:
+        invalidate_cached_user(old_username)
+
+async def _load_user(db: AsyncSession, username: str) -> Optional[models.User]:
+    cached = _user_cache.get(username)
+    if cached is MISSING:
+        user = await db.run_sync(crud.get_user_by_username, username)
+        if user is None:
+            return None
+        cached = (user.id, user.username, user.hashed_password)
+        _user_cache.set(username, cached)
+    user_id, username, hashed_password = cached
+    # A fresh, session-less instance per request, so cached state is never shared or mutated.
+    return models.User(id=user_id, username=username, hashed_password=hashed_password)
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db_session) 
+    db: AsyncSession = Depends(get_db)
 ) -> models.User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -52,7 +133,7 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, _signing_key, algorithms=[ALGORITHM])
         username: Optional[str] = payload.get("sub")
         if username is None:
             raise credentials_exception
@@ -60,7 +141,7 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = crud.get_user_by_username(db, username=username) 
+    user = await _load_user(db, username)
     if user is None:
         raise credentials_exception
     return user
\ No newline at end of file
@@ -0,0 +1,183 @@
+"""
+Maintenance commands, run from the repository root:
+
+    python -m app.cli repair-ratings [--doctor-id ID]
+    python -m app.cli rebuild-rollups [--doctor-id ID] [--check]
+    python -m app.cli backfill-sentiments [--batch-size N]
+    python -m app.cli purge-recommendations [--retention-days N] [--batch-size N]
+    python -m app.cli refresh-product-snapshots
+    python -m app.cli import-reviews FILE [--format csv|ndjson] [--user-id ID] [--batch-size N]
+    python -m app.cli migrate [--status]
+    python -m app.cli check-query-plans [--live]
+"""
+import argparse
+import codecs
+import sys
+from typing import List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from . import crud, importers, migrations, models, query_plans, tasks
+from .database import SessionLocal, engine
+
+
+def repair_ratings(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        repaired = crud.recalculate_doctor_ratings(db, doctor_id=args.doctor_id)
+    print(f"Repaired rating totals for {repaired} doctor(s).")
+
+
+def rebuild_rollups(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        drifted = crud.rebuild_doctor_rollups(db, doctor_id=args.doctor_id, dry_run=args.check)
+    if args.check:
+        print(f"Analytics rollups out of date for {len(drifted)} doctor(s): {drifted}")
+        if drifted:
+            raise SystemExit(1)
+    else:
+        print(f"Rebuilt analytics rollups; {len(drifted)} doctor(s) had drifted: {drifted}")
+
+
+def backfill_sentiments(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        updated = crud.backfill_review_sentiments(db, batch_size=args.batch_size)
+    print(f"Stored sentiment labels on {updated} review(s).")
+
+
+def purge_recommendations(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        recommendations, links = crud.purge_expired_recommendations(
+            db, retention_days=args.retention_days, batch_size=args.batch_size
+        )
+    print(f"Purged {recommendations} expired recommendation(s) and {links} product link(s).")
+
+
+def refresh_product_snapshots(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        refreshed = crud.refresh_product_snapshots(db)
+    print(f"Refreshed {refreshed} product snapshot(s).")
+
+
+def import_reviews(args: argparse.Namespace) -> None:
+    fmt = args.format or ("csv" if args.file.lower().endswith(".csv") else "ndjson")
+    job = importers.ReviewImport(fmt, user_id=args.user_id, batch_size=args.batch_size)
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    source = sys.stdin.buffer if args.file == "-" else open(args.file, "rb")
+    with source, SessionLocal() as db:
+        for chunk in iter(lambda: source.read(1 << 16), b""):
+            for batch in job.feed(decoder.decode(chunk)):
+                job.write_batch(db, batch)
+        for batch in job.feed(decoder.decode(b"", final=True)) + job.finish():
+            job.write_batch(db, batch)
+    result = job.result()
+    for error in result.errors:
+        print(f"line {error.line}: {error.error}")
+    print(f"Imported {result.imported} review(s); rejected {result.rejected}.")
+    if result.rejected:
+        raise SystemExit(1)
+
+
+def migrate(args: argparse.Namespace) -> None:
+    with engine.begin() as connection:
+        if args.status:
+            version = migrations.current_version(connection)
+            for migration in migrations.MIGRATIONS:
+                state = "applied" if migration.version <= version else "pending"
+                print(f"{migration.version:>4}  {state:<8} {migration.description}")
+            return
+        models.Base.metadata.create_all(connection)
+        applied = migrations.upgrade(connection)
+    for migration in applied:
+        print(f"Applied migration {migration.version}: {migration.description}")
+    print(f"Schema is at version {migrations.MIGRATIONS[-1].version}.")
+
+
+def check_query_plans(args: argparse.Namespace) -> None:
+    if args.live:
+        db = SessionLocal()
+    else:
+        # A scratch database with the schema the models and migrations define.
+        scratch = create_engine("sqlite://")
+        with scratch.begin() as connection:
+            models.Base.metadata.create_all(connection)
+            migrations.upgrade(connection)
+        db = Session(bind=scratch)
+    with db:
+        problems = query_plans.check_query_plans(db)
+    for name, descriptions in problems.items():
+        for description in descriptions:
+            print(f"{name}: {description}")
+    if problems:
+        raise SystemExit(1)
+    print(f"All {len(query_plans.HOT_QUERIES)} hot queries use indexes.")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Dermatologist API maintenance commands.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    repair = subparsers.add_parser(
+        "repair-ratings", help="Backfill each doctor's rating_sum/review_count/average_rating from its reviews."
+    )
+    repair.add_argument("--doctor-id", type=int, default=None, help="Only repair this doctor.")
+    repair.set_defaults(handler=repair_ratings)
+
+    rebuild = subparsers.add_parser(
+        "rebuild-rollups", help="Recompute the doctor analytics rollups from the reviews and recommendations tables."
+    )
+    rebuild.add_argument("--doctor-id", type=int, default=None, help="Only rebuild this doctor.")
+    rebuild.add_argument(
+        "--check", action="store_true", help="Only report doctors whose rollups disagree; exit 1 if any do."
+    )
+    rebuild.set_defaults(handler=rebuild_rollups)
+
+    backfill = subparsers.add_parser(
+        "backfill-sentiments", help="Label reviews that have no sentiment or one from an older lexicon version."
+    )
+    backfill.add_argument("--batch-size", type=int, default=1000)
+    backfill.set_defaults(handler=backfill_sentiments)
+
+    purge = subparsers.add_parser(
+        "purge-recommendations", help="Delete recommendations that expired more than --retention-days ago."
+    )
+    purge.add_argument("--retention-days", type=int, default=tasks.RECOMMENDATION_RETENTION_DAYS)
+    purge.add_argument("--batch-size", type=int, default=tasks.RECOMMENDATION_PURGE_BATCH_SIZE)
+    purge.set_defaults(handler=purge_recommendations)
+
+    snapshots = subparsers.add_parser(
+        "refresh-product-snapshots", help="Re-fetch catalog titles of every recommended product into product_snapshots."
+    )
+    snapshots.set_defaults(handler=refresh_product_snapshots)
+
+    import_parser = subparsers.add_parser(
+        "import-reviews", help="Bulk-load reviews from a CSV or NDJSON file (columns: doctor_id, user_id, rating, comment, timestamp)."
+    )
+    import_parser.add_argument("file", help="Path to the file, or - for stdin.")
+    import_parser.add_argument(
+        "--format", choices=importers.FORMATS, default=None, help="Defaults to csv for *.csv files, ndjson otherwise."
+    )
+    import_parser.add_argument("--user-id", type=int, default=None, help="Attribute every review to this user.")
+    import_parser.add_argument("--batch-size", type=int, default=importers.IMPORT_BATCH_SIZE)
+    import_parser.set_defaults(handler=import_reviews)
+
+    migrate_parser = subparsers.add_parser(
+        "migrate", help="Create missing tables and apply pending schema migrations (indexes, new columns)."
+    )
+    migrate_parser.add_argument("--status", action="store_true", help="Only list migrations and whether they are applied.")
+    migrate_parser.set_defaults(handler=migrate)
+
+    plans = subparsers.add_parser(
+        "check-query-plans", help="Fail if a hot read query would scan a whole table (SQLite EXPLAIN QUERY PLAN)."
+    )
+    plans.add_argument(
+        "--live", action="store_true", help="Check the DATABASE_URL database instead of a scratch copy of the schema."
+    )
+    plans.set_defaults(handler=check_query_plans)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
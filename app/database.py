@@ -1,16 +1,232 @@
 
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import asyncio
+import contextlib
+import itertools
+import os
+import time
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Union
 
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
 
-DATABASE_URL = "sqlite:///./test.db"  
 
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
 
+# SQLite tuning. "default" leaves SQLite's settings alone; "production" switches file databases to
+# WAL journaling (readers no longer block behind a writer), applies the pragmas below on every
+# pooled connection and serializes API writes through a single queue (see serialized_write).
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "default")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_KIB = int(os.getenv("SQLITE_CACHE_SIZE_KIB", "65536"))
+SQLITE_MMAP_SIZE_BYTES = int(os.getenv("SQLITE_MMAP_SIZE_BYTES", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_PROFILES = ("default", "production")
+
+# Read replicas: comma-separated URLs. Read-only endpoints are spread round-robin over the replicas
+# that passed their last health check (falling back to the primary when none did); a client that
+# wrote within READ_YOUR_WRITES_SECONDS reads from the primary so it sees its own writes.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_HEALTH_CHECK_SECONDS = float(os.getenv("REPLICA_HEALTH_CHECK_SECONDS", "10"))
+REPLICA_HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("REPLICA_HEALTH_CHECK_TIMEOUT_SECONDS", "2"))
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+READ_YOUR_WRITES_COOKIE = "primary_reads_until"
+
+# Async drivers used for the request path, by database backend.
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def to_async_url(url: str) -> URL:
+    parsed = make_url(url)
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername))
+
+def engine_options(url: str) -> dict:
+    """Pool settings shared by the sync and async engines (in-memory SQLite gets no pool sizing)."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+        "pool_pre_ping": parsed.get_backend_name() != "sqlite",
+    }
+
+def is_sqlite_file(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+def sqlite_pragmas(url: str, profile: str = SQLITE_PROFILE) -> List[str]:
+    """The PRAGMA statements run on each new connection for the given profile."""
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE {profile!r}; expected one of {', '.join(SQLITE_PROFILES)}")
+    if profile == "default" or not is_sqlite_file(url):
+        return []
+    return [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+        f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KIB}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE_BYTES}",
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+    ]
+
+def apply_sqlite_pragmas(sync_engine, url: str) -> None:
+    pragmas = sqlite_pragmas(url)
+    if not pragmas:
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+
+# Synchronous engine: used by the CLI and background jobs.
 engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False} 
+    DATABASE_URL,
+    connect_args={"check_same_thread": False} if make_url(DATABASE_URL).get_backend_name() == "sqlite" else {},
+    **engine_options(DATABASE_URL)
 )
+apply_sqlite_pragmas(engine, DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
\ No newline at end of file
+# Async engine: used by the API request path so database I/O never blocks the event loop.
+# crud functions take a sync Session; async handlers call them through AsyncSession.run_sync,
+# which runs them on the async driver without blocking.
+async_engine = create_async_engine(to_async_url(DATABASE_URL), **engine_options(DATABASE_URL))
+apply_sqlite_pragmas(async_engine.sync_engine, DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+class ReplicaRouter:
+    """Round-robin over the replica engines that passed their last health check."""
+
+    def __init__(self, engines: Sequence[AsyncEngine]):
+        self.engines = list(engines)
+        self._healthy = list(range(len(self.engines)))
+        self._turn = itertools.count()
+
+    def choose(self) -> Optional[AsyncEngine]:
+        healthy = self._healthy
+        if not healthy:
+            return None
+        return self.engines[healthy[next(self._turn) % len(healthy)]]
+
+    async def check_health(self) -> None:
+        healthy = []
+        for index, replica in enumerate(self.engines):
+            try:
+                await asyncio.wait_for(self._ping(replica), REPLICA_HEALTH_CHECK_TIMEOUT_SECONDS)
+            except (asyncio.TimeoutError, SQLAlchemyError, OSError) as e:
+                if index in self._healthy:
+                    print(f"Read replica {_display_url(replica)} failed its health check: {e}")
+                continue
+            if index not in self._healthy:
+                print(f"Read replica {_display_url(replica)} is healthy again")
+            healthy.append(index)
+        self._healthy = healthy
+
+    @staticmethod
+    async def _ping(replica: AsyncEngine) -> None:
+        async with replica.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    def stats(self) -> List[Dict[str, Union[str, bool]]]:
+        return [
+            {"replica": _display_url(replica), "healthy": index in self._healthy}
+            for index, replica in enumerate(self.engines)
+        ]
+
+def _display_url(replica: AsyncEngine) -> str:
+    return replica.url.render_as_string(hide_password=True)
+
+def _create_replica_engine(url: str) -> AsyncEngine:
+    replica = create_async_engine(to_async_url(url), **engine_options(url))
+    apply_sqlite_pragmas(replica.sync_engine, url)
+    return replica
+
+replica_router = ReplicaRouter([_create_replica_engine(url) for url in DATABASE_REPLICA_URLS])
+
+Base = declarative_base()
+
+# SQLite allows one writer at a time; with several API writes in flight the losers spin in
+# busy_timeout and can still fail with "database is locked". In the production profile writes
+# queue on this lock (FIFO) instead, while reads keep running in parallel. Other backends, and the
+# default profile, don't serialize.
+_write_lock = asyncio.Lock() if sqlite_pragmas(DATABASE_URL) else None
+
+# Per-request flag set by serialized_write, read by ReadYourWritesMiddleware.
+_request_writes: ContextVar[Optional[Dict[str, bool]]] = ContextVar("request_writes", default=None)
+
+@contextlib.asynccontextmanager
+async def serialized_write(db: AsyncSession) -> AsyncIterator[None]:
+    """Wrap a write transaction run from the API: `async with serialized_write(db): await db.run_sync(...)`."""
+    request_writes = _request_writes.get()
+    if request_writes is not None:
+        request_writes["wrote"] = True
+    if _write_lock is None:
+        yield
+        return
+    # Give the session's connection back before queuing: the writer at the head of the queue may
+    # need a fresh checkout (e.g. to refresh after its commit), which would never come if every
+    # queued writer sat on a pooled connection.
+    await db.commit()
+    async with _write_lock:
+        yield
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _reads_from_primary(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(READ_YOUR_WRITES_COOKIE, "0")) > time.time()
+    except ValueError:
+        return False
+
+async def get_read_db(request: Request) -> AsyncIterator[AsyncSession]:
+    """Session for read-only endpoints: a healthy replica, unless the client wrote recently."""
+    replica = None if _reads_from_primary(request) else replica_router.choose()
+    async with AsyncSessionLocal(bind=replica or async_engine) as db:
+        yield db
+
+class ReadYourWritesMiddleware:
+    """
+    After a request that wrote to the primary (through serialized_write), sets a short-lived
+    cookie that makes get_read_db use the primary for that client, so replication lag can't hide
+    its own writes from it. Does nothing when no replicas are configured.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replica_router.engines:
+            await self.app(scope, receive, send)
+            return
+        request_writes = {"wrote": False}
+        token = _request_writes.set(request_writes)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and request_writes["wrote"]:
+                cookie = (
+                    f"{READ_YOUR_WRITES_COOKIE}={time.time() + READ_YOUR_WRITES_SECONDS:.3f}; "
+                    f"Max-Age={READ_YOUR_WRITES_SECONDS}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_writes.reset(token)
@@ -0,0 +1,186 @@
+
+import csv
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from . import crud, models, schemas
+
+IMPORT_BATCH_SIZE = 1000
+# Only the first errors are reported back; the rejected count covers all of them.
+MAX_REPORTED_ERRORS = 100
+
+FORMATS = ("csv", "ndjson")
+
+# (line number, parsed record or None, parse error or None)
+ParsedRecord = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+class _RecordParser:
+    """
+    Incremental CSV / NDJSON parser: text is fed in arbitrary chunks and complete records are
+    returned as soon as they are available, so uploads and files never have to fit in memory.
+    CSV records may span lines (quoted newlines); a record is complete once its quotes balance.
+    """
+
+    def __init__(self, fmt: str):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported import format: {fmt}")
+        self.fmt = fmt
+        self._buffer = ""
+        self._line_no = 0
+        self._csv_header: Optional[List[str]] = None
+        self._csv_pending: List[str] = []
+        self._csv_start_line = 0
+
+    def feed(self, text: str) -> List[ParsedRecord]:
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        return [record for line in lines for record in self._parse_line(line)]
+
+    def close(self) -> List[ParsedRecord]:
+        records = self._parse_line(self._buffer) if self._buffer else []
+        self._buffer = ""
+        if self._csv_pending:
+            records.append((self._csv_start_line, None, "Unterminated quoted field"))
+            self._csv_pending = []
+        return records
+
+    def _parse_line(self, line: str) -> List[ParsedRecord]:
+        self._line_no += 1
+        line = line.rstrip("\r")
+        if self.fmt == "ndjson":
+            if not line.strip():
+                return []
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                return [(self._line_no, None, f"Invalid JSON: {e}")]
+            if not isinstance(record, dict):
+                return [(self._line_no, None, "Expected a JSON object")]
+            return [(self._line_no, record, None)]
+
+        if not self._csv_pending:
+            if not line.strip():
+                return []
+            self._csv_start_line = self._line_no
+        self._csv_pending.append(line)
+        text = "\n".join(self._csv_pending)
+        if text.count('"') % 2:
+            return []
+        self._csv_pending = []
+        values = next(csv.reader([text]))
+        if self._csv_header is None:
+            self._csv_header = [name.strip() for name in values]
+            return []
+        if len(values) != len(self._csv_header):
+            return [(self._csv_start_line, None, f"Expected {len(self._csv_header)} columns, got {len(values)}")]
+        # Empty cells mean "not given" for optional columns; an empty comment is still a comment.
+        record = {
+            name: value for name, value in zip(self._csv_header, values) if value != "" or name == "comment"
+        }
+        return [(self._csv_start_line, record, None)]
+
+class ReviewImport:
+    """
+    One review import run. Text chunks go in through feed()/finish(), which hand back batches of
+    parsed records; each batch is then validated and written in its own transaction by
+    write_batch(). When user_id is given every review is attributed to that user (rows naming a
+    different user are rejected); otherwise each row must carry its own user_id.
+    """
+
+    def __init__(self, fmt: str, user_id: Optional[int] = None, batch_size: int = IMPORT_BATCH_SIZE):
+        self._parser = _RecordParser(fmt)
+        self.user_id = user_id
+        self.batch_size = batch_size
+        self.imported = 0
+        self.rejected = 0
+        self.errors: List[schemas.ReviewImportError] = []
+        self._pending: List[ParsedRecord] = []
+
+    def feed(self, text: str) -> List[List[ParsedRecord]]:
+        self._pending.extend(self._parser.feed(text))
+        batches = []
+        while len(self._pending) >= self.batch_size:
+            batches.append(self._pending[:self.batch_size])
+            del self._pending[:self.batch_size]
+        return batches
+
+    def finish(self) -> List[List[ParsedRecord]]:
+        self._pending.extend(self._parser.close())
+        batches = [self._pending] if self._pending else []
+        self._pending = []
+        return batches
+
+    def write_batch(self, db: Session, batch: List[ParsedRecord]) -> None:
+        candidates = []
+        for line_no, record, error in batch:
+            if error is None:
+                try:
+                    review = schemas.ReviewImport.model_validate(record)
+                except ValidationError as e:
+                    error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+                else:
+                    if self.user_id is not None and review.user_id not in (None, self.user_id):
+                        error = "user_id must be omitted or match the authenticated user"
+            if error is not None:
+                self._reject(line_no, error)
+                continue
+            candidates.append((line_no, review))
+
+        doctor_ids = {review.doctor_id for _, review in candidates}
+        known_doctors = {
+            row.id for row in db.query(models.Doctor.id).filter(models.Doctor.id.in_(doctor_ids))
+        } if doctor_ids else set()
+        user_ids = {review.user_id for _, review in candidates if self.user_id is None and review.user_id is not None}
+        known_users = {
+            row.id for row in db.query(models.User.id).filter(models.User.id.in_(user_ids))
+        } if user_ids else set()
+
+        rows = []
+        for line_no, review in candidates:
+            user_id = self.user_id if self.user_id is not None else review.user_id
+            if review.doctor_id not in known_doctors:
+                self._reject(line_no, f"Doctor {review.doctor_id} not found")
+            elif user_id is None:
+                self._reject(line_no, "user_id is required")
+            elif self.user_id is None and user_id not in known_users:
+                self._reject(line_no, f"User {user_id} not found")
+            else:
+                rows.append({
+                    "doctor_id": review.doctor_id,
+                    "user_id": user_id,
+                    "rating": review.rating,
+                    "comment": review.comment,
+                    "timestamp": _to_naive_utc(review.timestamp) if review.timestamp else datetime.utcnow(),
+                })
+
+        try:
+            self.imported += crud.create_reviews(db, rows)
+        except SQLAlchemyError as e:
+            db.rollback()
+            first_line = min(line_no for line_no, _ in candidates)
+            print(f"Error importing review batch starting at line {first_line}: {e}")
+            self.rejected += len(rows)
+            self._report(first_line, f"Batch of {len(rows)} review(s) could not be written")
+
+    def result(self) -> schemas.ReviewImportResult:
+        errors = sorted(self.errors, key=lambda error: error.line)
+        return schemas.ReviewImportResult(imported=self.imported, rejected=self.rejected, errors=errors)
+
+    def _reject(self, line_no: int, error: str) -> None:
+        self.rejected += 1
+        self._report(line_no, error)
+
+    def _report(self, line_no: int, error: str) -> None:
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(schemas.ReviewImportError(line=line_no, error=error))
+
+def _to_naive_utc(timestamp: datetime) -> datetime:
+    # Review timestamps are stored as naive UTC, like datetime.utcnow().
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
@@ -1,46 +1,114 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Annotated
+from typing import List, Annotated, Literal, Optional
 from uuid import UUID as PyUUID
-from datetime import timedelta
+from datetime import datetime, timedelta
+import gzip
+import os
 
 from . import models
-from .database import SessionLocal, engine, Base
-from . import schemas, crud, auth, utils
+from .database import (
+    AsyncSessionLocal, engine, async_engine, Base, get_db, get_read_db, serialized_write, replica_router,
+    ReadYourWritesMiddleware
+)
+from . import schemas, crud, auth, utils, tasks, http_cache, metrics, migrations, serialization
+from .cache import MISSING, TTLCache
+from .pagination import encode_cursor, decode_cursor
+from .serialization import FastJSONResponse
+
+# Responses of at least this size are gzip-compressed for clients that send Accept-Encoding: gzip.
+GZIP_MINIMUM_SIZE_BYTES = int(os.getenv("GZIP_MINIMUM_SIZE_BYTES", "1024"))
+GZIP_COMPRESSION_LEVEL = int(os.getenv("GZIP_COMPRESSION_LEVEL", "6"))
 
 app = FastAPI(
     title="Dermatologist Rating and Recommendation API",
     version="1.0.0",
     description="API for rating dermatologists and managing product recommendations."
 )
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE_BYTES, compresslevel=GZIP_COMPRESSION_LEVEL)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(engine)
+metrics.instrument_engine(async_engine.sync_engine)
+for replica_engine in replica_router.engines:
+    metrics.instrument_engine(replica_engine.sync_engine)
 
 @app.on_event("startup")
 async def startup_event_handler():
-    Base.metadata.create_all(bind=engine)
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(migrations.upgrade)
+    await replica_router.check_health()
+    tasks.start_background_tasks()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@app.on_event("shutdown")
+async def shutdown_event_handler():
+    await tasks.stop_background_tasks()
+    auth.shutdown_password_executor()
 
-DbDep = Annotated[Session, Depends(get_db)]
+DbDep = Annotated[AsyncSession, Depends(get_db)]
+# Read-only endpoints: served by a read replica when any are configured.
+ReadDbDep = Annotated[AsyncSession, Depends(get_read_db)]
 CurrentUserDep = Annotated[models.User, Depends(auth.get_current_user)]
+ReviewsModeQuery = Annotated[
+    Literal["all", "latest", "none"],
+    Query(description="Embed all reviews, only the latest `reviews_limit` per doctor, or none (summary only).")
+]
+ReviewsLimitQuery = Annotated[int, Query(ge=1, le=50)]
+# Public recommendation responses: in-process cache lifetime, and how long clients/CDNs may reuse
+# a response before revalidating.
+RECOMMENDATION_CACHE_MAX_ENTRIES = int(os.getenv("RECOMMENDATION_CACHE_MAX_ENTRIES", "2048"))
+RECOMMENDATION_CACHE_TTL_SECONDS = float(os.getenv("RECOMMENDATION_CACHE_TTL_SECONDS", "300"))
+RECOMMENDATION_MAX_AGE_SECONDS = int(os.getenv("RECOMMENDATION_MAX_AGE_SECONDS", "60"))
+_recommendation_cache = TTLCache(maxsize=RECOMMENDATION_CACHE_MAX_ENTRIES, ttl_seconds=RECOMMENDATION_CACHE_TTL_SECONDS)
+
+# Review rows fetched per database round trip by the NDJSON export.
+REVIEW_EXPORT_BATCH_SIZE = 1000
+
+async def _build_recommendation_out(db: AsyncSession, db_recommendation: models.Recommendation) -> schemas.RecommendationOut:
+    product_ids = await db.run_sync(
+        lambda _: [link.product_id for link in db_recommendation.products_in_recommendation]
+    )
+    fetched = await run_in_threadpool(utils.fetch_products_details, product_ids)
+    product_details_list: List[schemas.ProductDetail] = []
+    for product_id, details in zip(product_ids, fetched):
+        if details:
+            product_details_list.append(details)
+        else:
+            print(f"Warning: Could not fetch details for product_id {product_id}")
+    return schemas.RecommendationOut(
+        uuid=PyUUID(db_recommendation.uuid),
+        doctor_id=db_recommendation.doctor_id,
+        notes=db_recommendation.notes,
+        timestamp=db_recommendation.timestamp,
+        expires_at=db_recommendation.expires_at,
+        products=product_details_list
+    )
 
 @app.post("/api/v1/auth/token", response_model=schemas.Token, tags=["Authentication"])
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     db: DbDep
 ):
-    user = crud.authenticate_user(db, username=form_data.username, password=form_data.password)
-    if not user:
+    user = await db.run_sync(crud.get_user_by_username, form_data.username)
+    verified, new_hash = (False, None)
+    if user:
+        verified, new_hash = await auth.verify_and_update_password_async(form_data.password, user.hashed_password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        async with serialized_write(db):
+            await db.run_sync(crud.update_user_password_hash, user, new_hash)
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
@@ -48,35 +116,32 @@ async def login_for_access_token(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.post("/api/v1/users/", response_model=schemas.User, status_code=status.HTTP_201_CREATED, tags=["Users"])
-def create_new_user(user: schemas.UserCreate, db: DbDep):
-    db_user = crud.get_user_by_username(db, username=user.username)
+async def create_new_user(user: schemas.UserCreate, db: DbDep):
+    db_user = await db.run_sync(crud.get_user_by_username, user.username)
     if db_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Username already registered")
-    return crud.create_user(db=db, user=user)
+    hashed_password = await auth.hash_password_async(user.password)
+    async with serialized_write(db):
+        return await db.run_sync(crud.create_user, user, hashed_password)
 
 @app.get("/api/v1/users/me", response_model=schemas.User, tags=["Users"])
 async def read_users_me(current_user: CurrentUserDep):
     return current_user
 
 @app.post("/api/v1/doctors/", response_model=schemas.DoctorOut, status_code=status.HTTP_201_CREATED, tags=["Doctors"])
-def create_new_doctor(
+async def create_new_doctor(
     doctor_data: schemas.DoctorCreate,
     db: DbDep,
     current_user: CurrentUserDep
 ):
-    existing_doctor_profile = crud.get_doctor_profile_by_user_id(db, user_id=current_user.id)
+    existing_doctor_profile = await db.run_sync(crud.get_doctor_profile_by_user_id, current_user.id)
     if existing_doctor_profile:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="This user account is already linked to a doctor profile."
         )
-    db_doctor_model_instance = models.Doctor(
-        **doctor_data.model_dump(),
-        user_id=current_user.id
-    )
-    db.add(db_doctor_model_instance)
-    db.commit()
-    db.refresh(db_doctor_model_instance)
+    async with serialized_write(db):
+        db_doctor_model_instance = await db.run_sync(crud.create_doctor, doctor_data, current_user.id)
     return schemas.DoctorOut(
         id=db_doctor_model_instance.id,
         name=db_doctor_model_instance.name,
@@ -86,121 +151,275 @@ def create_new_doctor(
     )
 
 @app.get("/api/v1/doctors/", response_model=List[schemas.DoctorOut], tags=["Doctors"])
-def get_all_doctors(
-    db: DbDep,
+async def get_all_doctors(
+    db: ReadDbDep,
     min_rating: float = 0.0,
     skip: int = 0,
-    limit: int = 10
+    limit: int = 10,
+    cursor: Annotated[
+        Optional[str],
+        Query(description="Opaque cursor from the X-Next-Cursor header of the previous page; replaces `skip`.")
+    ] = None,
+    reviews: ReviewsModeQuery = "all",
+    reviews_limit: ReviewsLimitQuery = 3
 ):
-    doctors_db = crud.get_doctors_by_rating(db, min_rating=min_rating, skip=skip, limit=limit)
-    results = []
-    for doc in doctors_db:
-        reviews_out = [schemas.ReviewOut.model_validate(rev) for rev in doc.reviews]
-        doc_out = schemas.DoctorOut(
-            id=doc.id,
-            name=doc.name,
-            specialization=doc.specialization,
-            average_rating=doc.average_rating,
-            reviews=reviews_out
+    after = None
+    if cursor:
+        try:
+            after_rating, after_id = decode_cursor(cursor, size=2)
+            after = (float(after_rating), int(after_id))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    def load(sync_db: Session) -> FastJSONResponse:
+        doctors_db = crud.get_doctors_by_rating(
+            sync_db, min_rating=min_rating, skip=skip, limit=limit, load_reviews=(reviews == "all"), after=after
         )
-        results.append(doc_out)
-    return results
+        headers = {}
+        if doctors_db and len(doctors_db) == limit:
+            last = doctors_db[-1]
+            headers["X-Next-Cursor"] = encode_cursor(last.average_rating, last.id)
+        latest_reviews = {}
+        if reviews == "latest":
+            latest_reviews = crud.get_latest_reviews_for_doctors(
+                sync_db, [doc.id for doc in doctors_db], per_doctor=reviews_limit
+            )
+        results = []
+        for doc in doctors_db:
+            if reviews == "all":
+                doc_reviews = doc.reviews
+            else:
+                doc_reviews = latest_reviews.get(doc.id, [])
+            results.append(serialization.doctor_payload(doc, doc_reviews))
+        return FastJSONResponse(results, headers=headers)
+
+    return await db.run_sync(load)
+
+# Declared before /api/v1/doctors/{doctor_id} so "search" is not taken for a doctor id.
+@app.get("/api/v1/doctors/search", response_model=List[schemas.DoctorOut], tags=["Doctors"])
+async def search_doctors(
+    db: ReadDbDep,
+    q: Annotated[str, Query(min_length=2, max_length=200, description="Words to match, as prefixes, against doctor name and specialization.")],
+    min_rating: float = 0.0,
+    skip: int = 0,
+    limit: Annotated[int, Query(ge=1, le=50)] = 10,
+    reviews: ReviewsModeQuery = "none",
+    reviews_limit: ReviewsLimitQuery = 3
+):
+    def load(sync_db: Session) -> FastJSONResponse:
+        doctors_db = crud.search_doctors(
+            sync_db, q, min_rating=min_rating, skip=skip, limit=limit, load_reviews=(reviews == "all")
+        )
+        latest_reviews = {}
+        if reviews == "latest":
+            latest_reviews = crud.get_latest_reviews_for_doctors(
+                sync_db, [doc.id for doc in doctors_db], per_doctor=reviews_limit
+            )
+        return FastJSONResponse([
+            serialization.doctor_payload(doc, doc.reviews if reviews == "all" else latest_reviews.get(doc.id, []))
+            for doc in doctors_db
+        ])
+
+    return await db.run_sync(load)
 
 @app.get("/api/v1/doctors/{doctor_id}", response_model=schemas.DoctorOut, tags=["Doctors"])
-def get_doctor_details(doctor_id: int, db: DbDep):
-    doctor = crud.get_doctor(db, doctor_id=doctor_id)
-    if doctor is None:
+async def get_doctor_details(
+    doctor_id: int,
+    db: ReadDbDep,
+    reviews: ReviewsModeQuery = "all",
+    reviews_limit: ReviewsLimitQuery = 3
+):
+    def load(sync_db: Session) -> Optional[FastJSONResponse]:
+        doctor = crud.get_doctor(sync_db, doctor_id=doctor_id)
+        if doctor is None:
+            return None
+        if reviews == "all":
+            doctor_reviews = doctor.reviews
+        elif reviews == "latest":
+            doctor_reviews = crud.get_latest_reviews_for_doctors(sync_db, [doctor.id], per_doctor=reviews_limit).get(doctor.id, [])
+        else:
+            doctor_reviews = []
+        return FastJSONResponse(serialization.doctor_payload(doctor, doctor_reviews))
+
+    doctor_response = await db.run_sync(load)
+    if doctor_response is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Doctor not found")
-    reviews_out = [schemas.ReviewOut.model_validate(rev) for rev in doctor.reviews]
-    return schemas.DoctorOut(
-        id=doctor.id,
-        name=doctor.name,
-        specialization=doctor.specialization,
-        average_rating=doctor.average_rating,
-        reviews=reviews_out
-    )
+    return doctor_response
+
+@app.get("/api/v1/doctors/{doctor_id}/reviews", response_model=List[schemas.ReviewOut], tags=["Reviews"])
+async def list_doctor_reviews(
+    doctor_id: int,
+    db: ReadDbDep,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    cursor: Annotated[
+        Optional[str],
+        Query(description="Opaque cursor from the X-Next-Cursor header of the previous page.")
+    ] = None
+):
+    if await db.run_sync(crud.get_doctor, doctor_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Doctor not found")
+    after = None
+    if cursor:
+        try:
+            after_timestamp, after_id = decode_cursor(cursor, size=2)
+            after = (datetime.fromisoformat(after_timestamp), int(after_id))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    page = await db.run_sync(crud.get_reviews_for_doctor, doctor_id, limit, after)
+    headers = {}
+    if len(page) == limit:
+        last = page[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last.timestamp.isoformat(), last.id)
+    return FastJSONResponse([serialization.review_payload(review) for review in page], headers=headers)
+
+@app.get(
+    "/api/v1/doctors/{doctor_id}/reviews/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}}},
+    tags=["Reviews"]
+)
+async def export_doctor_reviews(doctor_id: int, db: ReadDbDep):
+    if await db.run_sync(crud.get_doctor, doctor_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Doctor not found")
+
+    async def review_lines():
+        # The export outlives the request-scoped session, so it streams from its own session on
+        # the same database (replica or primary) that get_read_db picked for this request.
+        async with AsyncSessionLocal(bind=db.bind) as export_db:
+            rows = await export_db.stream(
+                crud.reviews_for_doctor_statement(doctor_id).execution_options(yield_per=REVIEW_EXPORT_BATCH_SIZE)
+            )
+            async for row in rows:
+                yield serialization.ndjson_line(serialization.review_payload(row))
+
+    return StreamingResponse(review_lines(), media_type="application/x-ndjson")
 
 @app.post("/api/v1/doctors/{doctor_id}/reviews", response_model=schemas.ReviewOut, status_code=status.HTTP_201_CREATED, tags=["Reviews"])
-def create_doctor_review(
+async def create_doctor_review(
     doctor_id: int,
     review: schemas.ReviewCreate,
     db: DbDep,
     current_user: CurrentUserDep
 ):
-    doctor = crud.get_doctor(db, doctor_id=doctor_id)
+    doctor = await db.run_sync(crud.get_doctor, doctor_id)
     if not doctor:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Doctor not found")
-    return crud.create_review(db=db, review=review, doctor_id=doctor_id, user_id=current_user.id)
+    async with serialized_write(db):
+        return await db.run_sync(crud.create_review, review, doctor_id, current_user.id)
 
 @app.post("/api/v1/doctors/{doctor_id}/recommendations", response_model=schemas.RecommendationOut, status_code=status.HTTP_201_CREATED, tags=["Recommendations"])
-def create_new_recommendation(
+async def create_new_recommendation(
     doctor_id: int,
     recommendation_data: schemas.RecommendationCreate,
     db: DbDep,
     current_user: CurrentUserDep
 ):
-    doctor = crud.get_doctor(db, doctor_id=doctor_id)
+    doctor = await db.run_sync(crud.get_doctor, doctor_id)
     if not doctor:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Doctor not found")
-    db_recommendation = crud.create_recommendation(
-        db=db,
-        rec_data=recommendation_data,
-        doctor_id=doctor_id
-    )
-    product_details_list: List[schemas.ProductDetail] = []
-    for prod_link in db_recommendation.products_in_recommendation:
-        details = utils.fetch_product_details_by_id(prod_link.product_id)
-        if details:
-            product_details_list.append(details)
-        else:
-            print(f"Warning: Could not fetch details for product_id {prod_link.product_id}")
-    return schemas.RecommendationOut(
-        uuid=PyUUID(db_recommendation.uuid),
-        doctor_id=db_recommendation.doctor_id,
-        notes=db_recommendation.notes,
-        timestamp=db_recommendation.timestamp,
-        expires_at=db_recommendation.expires_at,
-        products=product_details_list
-    )
+    async with serialized_write(db):
+        db_recommendation = await db.run_sync(crud.create_recommendation, recommendation_data, doctor_id)
+    return await _build_recommendation_out(db, db_recommendation)
+
+@app.post("/api/v1/doctors/{doctor_id}/recommendations/batch", response_model=List[schemas.RecommendationSummary], status_code=status.HTTP_201_CREATED, tags=["Recommendations"])
+async def create_recommendations_batch(
+    doctor_id: int,
+    batch: schemas.RecommendationBatchCreate,
+    db: DbDep,
+    current_user: CurrentUserDep
+):
+    """Creates up to 1000 recommendations in one transaction. Product details are not expanded."""
+    doctor = await db.run_sync(crud.get_doctor, doctor_id)
+    if not doctor:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Doctor not found")
+    async with serialized_write(db):
+        db_recommendations = await db.run_sync(crud.create_recommendations, batch.recommendations, doctor_id)
+    return [
+        schemas.RecommendationSummary(
+            uuid=PyUUID(rec.uuid),
+            doctor_id=rec.doctor_id,
+            notes=rec.notes,
+            timestamp=rec.timestamp,
+            expires_at=rec.expires_at,
+            product_ids=[link.product_id for link in rec.products_in_recommendation]
+        )
+        for rec in db_recommendations
+    ]
 
 @app.get("/api/v1/recommendations/{recommendation_uuid}", response_model=schemas.RecommendationOut, tags=["Recommendations"])
-def get_public_recommendation(recommendation_uuid: PyUUID, db: DbDep):
-    db_recommendation = crud.get_recommendation_by_uuid(db, uuid_str=str(recommendation_uuid))
-    if not db_recommendation:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recommendation not found or has expired")
-    product_details_list: List[schemas.ProductDetail] = []
-    for prod_link in db_recommendation.products_in_recommendation:
-        details = utils.fetch_product_details_by_id(prod_link.product_id)
-        if details:
-            product_details_list.append(details)
-        else:
-            print(f"Warning: Could not fetch details for product_id {prod_link.product_id}")
-    return schemas.RecommendationOut(
-        uuid=PyUUID(db_recommendation.uuid),
-        doctor_id=db_recommendation.doctor_id,
-        notes=db_recommendation.notes,
-        timestamp=db_recommendation.timestamp,
-        expires_at=db_recommendation.expires_at,
-        products=product_details_list
-    )
+async def get_public_recommendation(recommendation_uuid: PyUUID, request: Request, db: ReadDbDep):
+    """
+    Public share link. The assembled response is cached in-process (never past the
+    recommendation's expiry) and served with ETag, Last-Modified and Cache-Control, so repeat
+    opens and conditional revalidations (304) touch neither the database nor the catalog.
+    """
+    key = str(recommendation_uuid)
+    now = datetime.utcnow()
+    cached = _recommendation_cache.get(key)
+    if cached is MISSING or (cached[3] is not None and cached[3] <= now):
+        db_recommendation = await db.run_sync(crud.get_recommendation_by_uuid, key)
+        if not db_recommendation:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recommendation not found or has expired")
+        recommendation_out = await _build_recommendation_out(db, db_recommendation)
+        body = recommendation_out.model_dump_json().encode()
+        # Products missing because the catalog was unavailable: don't let this response be
+        # pinned, neither here nor in client or CDN caches.
+        if len(recommendation_out.products) != len(db_recommendation.products_in_recommendation):
+            return Response(content=body, media_type="application/json", headers={"Cache-Control": "no-store"})
+        # Compressed once here rather than per request by GZipMiddleware, which would also send
+        # the identity bytes' strong ETag with the gzip variant.
+        gzipped_body = None
+        if len(body) >= GZIP_MINIMUM_SIZE_BYTES:
+            gzipped_body = gzip.compress(body, compresslevel=GZIP_COMPRESSION_LEVEL, mtime=0)
+        cached = (body, http_cache.make_etag(body), now, db_recommendation.expires_at, gzipped_body)
+        ttl = RECOMMENDATION_CACHE_TTL_SECONDS
+        if db_recommendation.expires_at is not None:
+            ttl = min(ttl, (db_recommendation.expires_at - now).total_seconds())
+        if ttl > 0:
+            _recommendation_cache.set(key, cached, ttl_seconds=ttl)
+
+    body, etag, assembled_at, expires_at, gzipped_body = cached
+    max_age = RECOMMENDATION_MAX_AGE_SECONDS
+    if expires_at is not None:
+        max_age = min(max_age, int((expires_at - now).total_seconds()))
+    encoding = None
+    if gzipped_body is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        # Each encoding is a different representation, with its own strong validator.
+        body, etag, encoding = gzipped_body, etag[:-1] + '-gzip"', "gzip"
+    headers = http_cache.validator_headers(etag, assembled_at, max_age)
+    # GZipMiddleware adds "Vary: Accept-Encoding" to the identity body it passes through, but not
+    # to a 304 or to a body that is already encoded, so those get it here.
+    if http_cache.is_not_modified(request, etag, assembled_at):
+        if gzipped_body is not None:
+            headers["Vary"] = "Accept-Encoding"
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        headers["Vary"] = "Accept-Encoding"
+    return Response(content=body, media_type="application/json", headers=headers)
 
 # --- Doctor Analytics Endpoint ---
 @app.get("/api/v1/doctors/analytics/me", response_model=schemas.DoctorAnalyticsData, tags=["Doctors Analytics"])
 async def get_my_doctor_analytics(
-    db: DbDep,
+    db: ReadDbDep,
     current_user: CurrentUserDep
 ):
-    doctor_profile = crud.get_doctor_profile_by_user_id(db, user_id=current_user.id)
+    doctor_profile = await db.run_sync(crud.get_doctor_profile_by_user_id, current_user.id)
     if not doctor_profile:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Doctor profile not found for the authenticated user. Ensure your user account is linked to a doctor profile."
         )
     doctor_id = doctor_profile.id
-    overall_avg, total_rev, total_reco_events, total_prods_reco = crud.get_doctor_overall_stats(db, doctor_id=doctor_id)
-    rating_trends = crud.calculate_rating_trends(db, doctor_id=doctor_id)
-    top_products = crud.get_top_recommended_products(db, doctor_id=doctor_id, limit=5)
-    sentiment_breakdown = crud.analyze_review_sentiments(db, doctor_id=doctor_id)
+    overall_avg, total_rev, total_reco_events, total_prods_reco = await db.run_sync(crud.get_rollup_overall_stats, doctor_id)
+    rating_trends = await db.run_sync(crud.get_rollup_rating_trends, doctor_id)
+    product_counts = await db.run_sync(crud.get_rollup_product_counts, doctor_id, 5)
+    sentiment_breakdown = await db.run_sync(crud.get_sentiment_breakdown, doctor_id)
+    known_titles = await db.run_sync(crud.get_snapshot_titles, [prod_id for prod_id, _ in product_counts])
+    if all(prod_id in known_titles for prod_id, _ in product_counts):
+        top_products = crud.attach_product_titles(product_counts, known_titles)
+    else:
+        top_products = await run_in_threadpool(crud.attach_product_titles, product_counts, known_titles)
     return schemas.DoctorAnalyticsData(
         overall_average_rating=overall_avg,
         total_reviews=total_rev,
@@ -211,6 +430,60 @@ async def get_my_doctor_analytics(
         review_sentiment_breakdown=sentiment_breakdown
     )
 
+def _collect_runtime_metrics():
+    """Cache, catalog client, connection pool and password pool state, read at scrape time."""
+    caches = {
+        "product": utils.product_cache_stats(),
+        "user": auth.user_cache_stats(),
+        "recommendation_response": _recommendation_cache.stats(),
+    }
+    cache_hits = CounterMetricFamily("cache_hits", "Cache lookups answered from the cache.", labels=["cache"])
+    cache_misses = CounterMetricFamily("cache_misses", "Cache lookups that missed.", labels=["cache"])
+    cache_evictions = CounterMetricFamily("cache_evictions", "Entries evicted to stay within maxsize.", labels=["cache"])
+    cache_size = GaugeMetricFamily("cache_entries", "Entries currently cached.", labels=["cache"])
+    for name, stats in caches.items():
+        cache_hits.add_metric([name], stats["hits"])
+        cache_misses.add_metric([name], stats["misses"])
+        cache_evictions.add_metric([name], stats["evictions"])
+        cache_size.add_metric([name], stats["size"])
+    yield from (cache_hits, cache_misses, cache_evictions, cache_size)
+
+    catalog = utils.catalog_client_stats()
+    events = CounterMetricFamily("catalog_client_events", "Catalog client retries, failures and fallbacks.", labels=["event"])
+    for event_name in ("retries", "failures", "short_circuited", "stale_served", "revalidations"):
+        events.add_metric([event_name], catalog[event_name])
+    events.add_metric(["coalesced"], catalog["cache"]["coalesced"])
+    yield events
+    breaker = GaugeMetricFamily("catalog_circuit_state", "1 for the catalog circuit breaker's current state.", labels=["state"])
+    for state in ("closed", "open", "half_open"):
+        breaker.add_metric([state], 1 if catalog["breaker"]["state"] == state else 0)
+    yield breaker
+
+    pool = GaugeMetricFamily("db_pool_connections", "Database pool connections by state.", labels=["engine", "state"])
+    for engine_name, pool_engine in (("sync", engine), ("async", async_engine.sync_engine)):
+        engine_pool = pool_engine.pool
+        if hasattr(engine_pool, "checkedout"):
+            pool.add_metric([engine_name, "checked_out"], engine_pool.checkedout())
+            pool.add_metric([engine_name, "idle"], engine_pool.checkedin())
+            pool.add_metric([engine_name, "overflow"], max(0, engine_pool.overflow()))
+    yield pool
+
+    replicas = GaugeMetricFamily("db_replica_healthy", "1 if the read replica passed its last health check.", labels=["replica"])
+    for replica in replica_router.stats():
+        replicas.add_metric([replica["replica"]], 1 if replica["healthy"] else 0)
+    yield replicas
+
+    yield GaugeMetricFamily(
+        "password_hash_jobs", "Password hash/verify jobs queued or running.", value=auth.pending_password_jobs()
+    )
+
+metrics.register_callback(_collect_runtime_metrics)
+
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/", tags=["Root"])
 async def read_root():
     return {"message": "Welcome to the Dermatologist API. Visit /docs for API documentation."}
\ No newline at end of file
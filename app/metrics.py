@@ -0,0 +1,135 @@
+
+import functools
+import inspect
+import time
+from contextvars import ContextVar
+from typing import Callable, Iterable, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import Metric
+from prometheus_client.registry import Collector
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Bucket bounds (seconds) shared by the latency histograms: sub-millisecond queries up to
+# multi-second catalog timeouts.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled, by route template and status code.", ["method", "route", "status"]
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time from request start until the response is fully sent.",
+    ["method", "route"], buckets=LATENCY_BUCKETS
+)
+DB_QUERIES = Counter(
+    "db_queries_total", "SQL statements executed, by the crud function that issued them.", ["operation"]
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time, by the crud function that issued it.",
+    ["operation"], buckets=LATENCY_BUCKETS
+)
+CRUD_CALL_DURATION = Histogram(
+    "crud_call_duration_seconds", "Wall time of crud function calls, including their queries.",
+    ["function"], buckets=LATENCY_BUCKETS
+)
+CATALOG_REQUEST_DURATION = Histogram(
+    "catalog_request_duration_seconds", "Product catalog HTTP calls, by outcome (ok, not_found, error, timeout).",
+    ["outcome"], buckets=LATENCY_BUCKETS
+)
+
+# Name of the crud function currently running, so SQL events can be attributed to it. Every
+# crud call runs in one thread (or one run_sync greenlet), so the context variable follows it.
+_current_operation: ContextVar[str] = ContextVar("db_operation", default="other")
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no per-request task or body buffering) recording request counts and
+    latency labelled with the matched route template, e.g. /api/v1/doctors/{doctor_id}.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            HTTP_REQUEST_DURATION.labels(scope["method"], route_path).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(scope["method"], route_path, str(status_code)).inc()
+
+def instrument_engine(engine: Engine) -> None:
+    """Counts and times every statement run on engine (pass async_engine.sync_engine for async)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        operation = _current_operation.get()
+        DB_QUERIES.labels(operation).inc()
+        DB_QUERY_DURATION.labels(operation).observe(time.perf_counter() - context._metrics_started)
+
+def instrument_functions(namespace: dict, module_name: str) -> None:
+    """
+    Wraps the public functions defined in a module (pass its globals()) so their calls are timed
+    and the SQL they issue is attributed to them. Nested calls keep the outermost operation name.
+    Generator functions are left alone: their work happens after the call returns.
+    """
+    for name, func in list(namespace.items()):
+        if (
+            name.startswith("_")
+            or not inspect.isfunction(func)
+            or func.__module__ != module_name
+            or inspect.isgeneratorfunction(func)
+        ):
+            continue
+        namespace[name] = _timed(func)
+
+def _timed(func: Callable) -> Callable:
+    name = func.__name__
+    histogram = CRUD_CALL_DURATION.labels(name)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _current_operation.set(name) if _current_operation.get() == "other" else None
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - started)
+            if token is not None:
+                _current_operation.reset(token)
+
+    return wrapper
+
+class _CallbackCollector(Collector):
+    def __init__(self, callback: Callable[[], Iterable[Metric]]):
+        self.callback = callback
+
+    def collect(self) -> Iterable[Metric]:
+        return self.callback()
+
+def register_callback(callback: Callable[[], Iterable[Metric]]) -> None:
+    """Registers a function that builds metric families at scrape time, for state that already
+    lives elsewhere (cache counters, pool occupancy) and so costs nothing on the request path."""
+    REGISTRY.register(_CallbackCollector(callback))
+
+def render() -> Tuple[bytes, str]:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
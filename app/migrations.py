@@ -0,0 +1,144 @@
+
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Sequence
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
+
+from . import crud, models
+
+# Kept out of models.Base.metadata: it describes the database, not the application's data.
+schema_version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    schema_version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+def _add_missing_columns(connection: Connection, columns: Sequence[str]) -> List[str]:
+    """Adds the given "table.column" model columns to existing tables that lack them."""
+    inspector = inspect(connection)
+    added = []
+    for qualified_name in columns:
+        table_name, column_name = qualified_name.split(".")
+        if not inspector.has_table(table_name):
+            continue
+        if column_name in {column["name"] for column in inspector.get_columns(table_name)}:
+            continue
+        column = models.Base.metadata.tables[table_name].c[column_name]
+        column_spec = CreateColumn(column).compile(dialect=connection.dialect)
+        connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_spec}"))
+        added.append(qualified_name)
+    return added
+
+def _create_missing_indexes(connection: Connection, index_names: Sequence[str]) -> None:
+    indexes = {index.name: index for table in models.Base.metadata.tables.values() for index in table.indexes}
+    for name in index_names:
+        indexes[name].create(connection, checkfirst=True)
+
+def _add_denormalized_columns(connection: Connection) -> None:
+    added = _add_missing_columns(connection, [
+        "doctors.rating_sum",
+        "doctors.review_count",
+        "reviews.sentiment",
+        "reviews.sentiment_version",
+        "doctor_stats.purged_recommendations",
+        "doctor_stats.purged_products_recommended",
+        "doctor_product_counts.purged_count",
+    ])
+    if "doctors.rating_sum" in added:
+        connection.execute(text(
+            "UPDATE doctors SET"
+            " rating_sum = (SELECT COALESCE(SUM(rating), 0) FROM reviews WHERE reviews.doctor_id = doctors.id),"
+            " review_count = (SELECT COUNT(*) FROM reviews WHERE reviews.doctor_id = doctors.id)"
+        ))
+    if added:
+        # Sentiment labels are backfilled by the API on startup, the analytics rollups by migration 4.
+        print(f"Added column(s): {', '.join(added)}")
+
+def _add_hot_query_indexes(connection: Connection) -> None:
+    _create_missing_indexes(connection, [
+        "ix_doctors_average_rating_id",
+        "ix_reviews_doctor_id_timestamp",
+        "ix_reviews_doctor_id_sentiment",
+        "ix_recommendations_expires_at",
+        "ix_recommendations_doctor_id_timestamp",
+        "ix_product_recommendation_links_recommendation_id_product_id",
+        "ix_doctor_product_counts_doctor_id_count",
+    ])
+
+def _add_doctor_search_index(connection: Connection) -> None:
+    """
+    SQLite FTS5 index over doctor name and specialization for crud.search_doctors, stored as an
+    external-content table (no copy of the text) kept in sync by triggers, so bulk inserts and raw
+    SQL writes are indexed too. The update trigger only fires for the indexed columns, not for the
+    rating updates every review makes. Other backends search with ILIKE and need nothing here.
+    """
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS doctors_fts USING fts5("
+        " name, specialization, content='doctors', content_rowid='id',"
+        " tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        "CREATE TRIGGER IF NOT EXISTS doctors_fts_insert AFTER INSERT ON doctors BEGIN"
+        " INSERT INTO doctors_fts(rowid, name, specialization) VALUES (new.id, new.name, new.specialization);"
+        " END",
+        "CREATE TRIGGER IF NOT EXISTS doctors_fts_delete AFTER DELETE ON doctors BEGIN"
+        " INSERT INTO doctors_fts(doctors_fts, rowid, name, specialization)"
+        " VALUES ('delete', old.id, old.name, old.specialization);"
+        " END",
+        "CREATE TRIGGER IF NOT EXISTS doctors_fts_update AFTER UPDATE OF name, specialization ON doctors BEGIN"
+        " INSERT INTO doctors_fts(doctors_fts, rowid, name, specialization)"
+        " VALUES ('delete', old.id, old.name, old.specialization);"
+        " INSERT INTO doctors_fts(rowid, name, specialization) VALUES (new.id, new.name, new.specialization);"
+        " END",
+        "INSERT INTO doctors_fts(doctors_fts) VALUES ('rebuild')",
+    ):
+        connection.execute(text(statement))
+
+def _populate_analytics_rollups(connection: Connection) -> None:
+    """Fills doctor_stats, doctor_monthly_ratings and doctor_product_counts from the reviews and
+    recommendations written before the rollups were maintained."""
+    with Session(bind=connection) as db:
+        drifted = crud.rebuild_doctor_rollups(db)
+    if drifted:
+        print(f"Rebuilt analytics rollups for {len(drifted)} doctor(s)")
+
+# Append-only: never edit or reorder an applied migration, add a new one instead. Each must be
+# idempotent, because a database created by Base.metadata.create_all already has the end state.
+MIGRATIONS = [
+    Migration(1, "Add doctor rating totals, stored review sentiment and purged rollup counts", _add_denormalized_columns),
+    Migration(2, "Add secondary indexes for the doctor, review and recommendation query filters", _add_hot_query_indexes),
+    Migration(3, "Add the full-text doctor search index", _add_doctor_search_index),
+    Migration(4, "Populate the analytics rollups from existing reviews and recommendations", _populate_analytics_rollups),
+]
+
+def current_version(connection: Connection) -> int:
+    if not inspect(connection).has_table("schema_version"):
+        return 0
+    return connection.execute(select(schema_version.c.version).order_by(schema_version.c.version.desc())).scalar() or 0
+
+def upgrade(connection: Connection) -> List[Migration]:
+    """Applies pending migrations in order on `connection` (run it inside a transaction, after
+    Base.metadata.create_all so new tables exist). Returns the migrations applied."""
+    schema_version_metadata.create_all(connection)
+    version = current_version(connection)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        migration.apply(connection)
+        connection.execute(schema_version.insert().values(
+            version=migration.version, description=migration.description, applied_at=datetime.utcnow()
+        ))
+        applied.append(migration)
+    return applied
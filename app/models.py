@@ -1,5 +1,5 @@
 
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime 
 from uuid import uuid4 
@@ -23,6 +23,9 @@ class Doctor(Base):
     name = Column(String, nullable=False)
     specialization = Column(String, nullable=False)
     average_rating = Column(Float, default=0.0)
+    # Running totals kept in step with the reviews table so average_rating can be updated in O(1).
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
+    review_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     reviews = relationship("Review", back_populates="doctor", cascade="all, delete-orphan")
     recommendations_made = relationship("Recommendation", back_populates="doctor", cascade="all, delete-orphan")
@@ -30,6 +33,11 @@ class Doctor(Base):
 
     user_account = relationship("User", back_populates="doctor_profile")
 
+    __table_args__ = (
+        # Matches the (average_rating DESC, id) ordering used by the doctor listing's keyset pagination.
+        Index("ix_doctors_average_rating_id", average_rating.desc(), id),
+    )
+
 
 class Review(Base):
     __tablename__ = "reviews"
@@ -40,10 +48,19 @@ class Review(Base):
     rating = Column(Integer, nullable=False)
     comment = Column(Text) 
     timestamp = Column(DateTime, default=datetime.utcnow)
+    # Label assigned when the review is written (NULL for blank comments), stamped with the
+    # lexicon version that produced it.
+    sentiment = Column(String(8), nullable=True)
+    sentiment_version = Column(Integer, nullable=True)
 
     doctor = relationship("Doctor", back_populates="reviews")
     user = relationship("User")
 
+    __table_args__ = (
+        Index("ix_reviews_doctor_id_timestamp", doctor_id, timestamp),
+        Index("ix_reviews_doctor_id_sentiment", doctor_id, sentiment_version, sentiment),
+    )
+
 class Recommendation(Base):
     __tablename__ = "recommendations"
     id = Column(Integer, primary_key=True, index=True)
@@ -52,11 +69,15 @@ class Recommendation(Base):
     
     notes = Column(Text, nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
-    expires_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
 
     doctor = relationship("Doctor", back_populates="recommendations_made")
     products_in_recommendation = relationship("ProductRecommendationLink", back_populates="recommendation", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_recommendations_doctor_id_timestamp", doctor_id, timestamp),
+    )
+
 class ProductRecommendationLink(Base):
     __tablename__ = "product_recommendation_links"
     id = Column(Integer, primary_key=True, index=True)
@@ -65,3 +86,46 @@ class ProductRecommendationLink(Base):
 
     recommendation = relationship("Recommendation", back_populates="products_in_recommendation")
 
+    __table_args__ = (
+        # Covers the recommendation -> products join of the per-doctor product counts, and the
+        # link deletes of the expiry purge.
+        Index("ix_product_recommendation_links_recommendation_id_product_id", recommendation_id, product_id),
+    )
+
+
+# --- Analytics rollups, maintained incrementally by crud on every review/recommendation write ---
+
+class DoctorStats(Base):
+    __tablename__ = "doctor_stats"
+    doctor_id = Column(Integer, ForeignKey("doctors.id"), primary_key=True)
+    total_recommendations = Column(Integer, nullable=False, default=0)
+    total_products_recommended = Column(Integer, nullable=False, default=0)
+    # Share of the totals above whose recommendations were purged after expiry, kept so that
+    # rebuild_doctor_rollups can reproduce lifetime totals from the remaining rows.
+    purged_recommendations = Column(Integer, nullable=False, default=0, server_default="0")
+    purged_products_recommended = Column(Integer, nullable=False, default=0, server_default="0")
+
+class DoctorMonthlyRating(Base):
+    __tablename__ = "doctor_monthly_ratings"
+    doctor_id = Column(Integer, ForeignKey("doctors.id"), primary_key=True)
+    period = Column(String(7), primary_key=True)  # "YYYY-MM"
+    rating_sum = Column(Integer, nullable=False, default=0)
+    rating_count = Column(Integer, nullable=False, default=0)
+
+class DoctorProductCount(Base):
+    __tablename__ = "doctor_product_counts"
+    doctor_id = Column(Integer, ForeignKey("doctors.id"), primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+    recommendation_count = Column(Integer, nullable=False, default=0)
+    purged_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        Index("ix_doctor_product_counts_doctor_id_count", doctor_id, recommendation_count),
+    )
+
+class ProductSnapshot(Base):
+    """Local copy of catalog product titles for analytics, refreshed periodically by a background job."""
+    __tablename__ = "product_snapshots"
+    product_id = Column(Integer, primary_key=True)
+    title = Column(String, nullable=False)
+    refreshed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,20 @@
+
+import base64
+import binascii
+import json
+from typing import Any, List
+
+def encode_cursor(*values: Any) -> str:
+    """Packs the sort-key values of the last row of a page into an opaque, URL-safe cursor."""
+    raw = json.dumps(list(values), separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Unpacks a cursor made by encode_cursor. Raises ValueError if it is malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
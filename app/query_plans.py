@@ -0,0 +1,73 @@
+
+import re
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import crud, models
+
+# The read queries behind the listing, detail, review and analytics endpoints, called with
+# representative arguments. Every SQL statement they issue is checked.
+HOT_QUERIES: Dict[str, Callable[[Session], object]] = {
+    "get_doctors_by_rating": lambda db: crud.get_doctors_by_rating(db, min_rating=3.0, limit=10, load_reviews=True),
+    "get_doctors_by_rating (keyset)": lambda db: crud.get_doctors_by_rating(db, limit=10, after=(4.0, 1)),
+    "search_doctors": lambda db: crud.search_doctors(db, "derm", min_rating=3.0),
+    "get_latest_reviews_for_doctors": lambda db: crud.get_latest_reviews_for_doctors(db, [1, 2, 3], per_doctor=3),
+    "get_reviews_for_doctor": lambda db: crud.get_reviews_for_doctor(db, 1, limit=20),
+    "get_doctor_overall_stats": lambda db: crud.get_doctor_overall_stats(db, 1),
+    "get_top_recommended_products": lambda db: crud.get_top_recommended_products(db, 1),
+    "analyze_review_sentiments": lambda db: crud.analyze_review_sentiments(db, 1),
+    "get_sentiment_breakdown": lambda db: crud.get_sentiment_breakdown(db, 1),
+    "calculate_rating_trends": lambda db: crud.calculate_rating_trends(db, 1),
+    "get_recommendation_by_uuid": lambda db: crud.get_recommendation_by_uuid(db, "00000000-0000-0000-0000-000000000000"),
+    "get_rollup_rating_trends": lambda db: crud.get_rollup_rating_trends(db, 1),
+    "get_rollup_product_counts": lambda db: crud.get_rollup_product_counts(db, 1),
+}
+
+# "SCAN reviews" is a full table scan; "SCAN doctors USING INDEX ..." walks an index in order.
+# Scans of subquery results (anon_1, ...) are not table reads and are ignored.
+_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+def capture_statements(db: Session, query: Callable[[Session], object]) -> List[Tuple[str, tuple]]:
+    """Runs query and returns the (statement, parameters) it sent to the database."""
+    statements: List[Tuple[str, tuple]] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    bind = db.get_bind()
+    event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    try:
+        query(db)
+    finally:
+        event.remove(bind, "before_cursor_execute", before_cursor_execute)
+        db.rollback()
+    return statements
+
+def full_table_scans(db: Session, statement: str, parameters: tuple) -> List[str]:
+    """Tables that SQLite's EXPLAIN QUERY PLAN says the statement reads in full."""
+    plan = db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    return [
+        match.group(1)
+        for _, _, _, detail in plan
+        if (match := _FULL_SCAN.match(detail)) and match.group(1) in models.Base.metadata.tables
+    ]
+
+def check_query_plans(db: Session) -> Dict[str, List[str]]:
+    """
+    Maps each hot query that reads a table in full to descriptions of the offending statements
+    (an empty result means every query is index-backed). SQLite only: other backends' plans
+    depend on table statistics, so check those with EXPLAIN against production-sized data.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        raise ValueError("Query plan checks are only supported on SQLite")
+    problems: Dict[str, List[str]] = {}
+    for name, query in HOT_QUERIES.items():
+        for statement, parameters in capture_statements(db, query):
+            tables = full_table_scans(db, statement, parameters)
+            if tables:
+                summary = " ".join(statement.split())[:120]
+                problems.setdefault(name, []).append(f"full scan of {', '.join(tables)}: {summary}")
+    return problems
@@ -42,6 +42,20 @@ class ReviewBase(BaseModel):
 class ReviewCreate(ReviewBase):
     pass 
 
+class ReviewImport(ReviewCreate):
+    doctor_id: int
+    user_id: Optional[int] = None
+    timestamp: Optional[datetime] = None
+
+class ReviewImportError(BaseModel):
+    line: int
+    error: str
+
+class ReviewImportResult(BaseModel):
+    imported: int
+    rejected: int
+    errors: List[ReviewImportError]
+
 class ReviewOut(ReviewBase):
     id: int
     doctor_id: int
@@ -96,6 +110,17 @@ class RecommendationCreate(RecommendationBase):
    
     pass
 
+class RecommendationBatchCreate(BaseModel):
+    recommendations: List[RecommendationCreate] = Field(..., min_length=1, max_length=1000)
+
+class RecommendationSummary(BaseModel):
+    uuid: PyUUID
+    doctor_id: int
+    notes: Optional[str]
+    timestamp: datetime
+    expires_at: Optional[datetime]
+    product_ids: List[int]
+
 class RecommendationOut(BaseModel):
     uuid: PyUUID 
     doctor_id: int
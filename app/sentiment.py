@@ -0,0 +1,80 @@
+
+from collections import Counter
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import ahocorasick
+
+POSITIVE_KEYWORDS = (
+    "good", "great", "excellent", "fantastic", "helpful", "positive", "love", "best", "amazing",
+    "satisfied", "recommend", "pleased", "impressed", "wonderful", "effective",
+)
+NEGATIVE_KEYWORDS = (
+    "bad", "poor", "terrible", "awful", "negative", "hate", "worst", "avoid", "disappointed",
+    "unhelpful", "rush", "problem", "issue", "concern", "not good",
+)
+
+# Bump whenever the lexicon or scoring changes: stored review labels with an older version
+# are recomputed (lazily at read time, and persistently by the backfill job).
+LEXICON_VERSION = 1
+
+# Automaton.iter() yields (end index, keyword) for each occurrence.
+_keyword = itemgetter(1)
+
+class SentimentAnalyzer:
+    """
+    Keyword-based sentiment labelling. A text scores +1 for every positive keyword and -1 for
+    every negative keyword that occurs in its lower-cased form (as a substring, each keyword
+    counted once); the sign of the score gives "positive", "negative" or "neutral".
+
+    The lexicon is compiled once into an Aho-Corasick automaton over the keywords with a nonzero
+    net weight (a keyword in both lists cancels out), so each text is scanned in a single pass
+    that reports every occurrence, overlapping ones included, instead of once per keyword. See
+    benchmarks/bench_sentiment.py.
+    """
+
+    def __init__(
+        self,
+        positive_keywords: Sequence[str] = POSITIVE_KEYWORDS,
+        negative_keywords: Sequence[str] = NEGATIVE_KEYWORDS,
+        version: int = LEXICON_VERSION
+    ):
+        if not all(positive_keywords) or not all(negative_keywords):
+            raise ValueError("Sentiment keywords must be non-empty")
+        self.positive_keywords = tuple(positive_keywords)
+        self.negative_keywords = tuple(negative_keywords)
+        self.version = version
+        weights: Counter = Counter(self.positive_keywords)
+        weights.subtract(Counter(self.negative_keywords))
+        self._weights = {keyword: weight for keyword, weight in weights.items() if weight}
+        self._automaton = ahocorasick.Automaton()
+        for keyword in self._weights:
+            self._automaton.add_word(keyword, keyword)
+        if self._weights:
+            self._automaton.make_automaton()
+
+    def label(self, text: Optional[str]) -> str:
+        if not text or not self._weights:
+            return "neutral"
+        matched = set(map(_keyword, self._automaton.iter(text.lower())))
+        return self._label_for_score(sum(map(self._weights.__getitem__, matched)))
+
+    def label_many(self, texts: Iterable[Optional[str]]) -> List[str]:
+        """Labels many texts at once, in input order."""
+        return [self.label(text) for text in texts]
+
+    def count_labels(self, texts: Iterable[Optional[str]]) -> Dict[str, int]:
+        counts = {"positive": 0, "neutral": 0, "negative": 0}
+        for label in self.label_many(texts):
+            counts[label] += 1
+        return counts
+
+    @staticmethod
+    def _label_for_score(score: int) -> str:
+        if score > 0:
+            return "positive"
+        elif score < 0:
+            return "negative"
+        return "neutral"
+
+default_analyzer = SentimentAnalyzer()
@@ -0,0 +1,42 @@
+"""
+Fast JSON path for the doctor and review read endpoints. Their rows come straight from our own
+database, so instead of validating them into schemas.DoctorOut/ReviewOut and letting FastAPI
+validate and serialize those again for response_model, they are copied into plain dicts and
+encoded once with orjson. The schemas stay the documented contract (the routes keep
+response_model for OpenAPI); keep the field lists below in step with them.
+"""
+from typing import Any, Dict, Iterable
+
+import orjson
+from fastapi.responses import Response
+
+class FastJSONResponse(Response):
+    """JSON response rendered with orjson, for content built from trusted rows. Nothing is validated."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+def review_payload(review) -> Dict[str, Any]:
+    """schemas.ReviewOut fields of a Review (or a row with the same columns)."""
+    return {
+        "rating": review.rating,
+        "comment": review.comment,
+        "id": review.id,
+        "doctor_id": review.doctor_id,
+        "user_id": review.user_id,
+        "timestamp": review.timestamp,
+    }
+
+def doctor_payload(doctor, reviews: Iterable) -> Dict[str, Any]:
+    """schemas.DoctorOut fields of a Doctor with the given reviews embedded."""
+    return {
+        "name": doctor.name,
+        "specialization": doctor.specialization,
+        "id": doctor.id,
+        "average_rating": doctor.average_rating,
+        "reviews": [review_payload(review) for review in reviews],
+    }
+
+def ndjson_line(payload: Dict[str, Any]) -> bytes:
+    return orjson.dumps(payload, option=orjson.OPT_APPEND_NEWLINE)
@@ -0,0 +1,85 @@
+
+import asyncio
+import os
+from typing import Set, Tuple
+
+from . import crud
+from .database import REPLICA_HEALTH_CHECK_SECONDS, SessionLocal, replica_router
+
+# Expired recommendations are kept this long after expiry, then deleted by the purge job.
+RECOMMENDATION_RETENTION_DAYS = int(os.getenv("RECOMMENDATION_RETENTION_DAYS", "30"))
+RECOMMENDATION_PURGE_INTERVAL_SECONDS = float(os.getenv("RECOMMENDATION_PURGE_INTERVAL_SECONDS", "3600"))
+RECOMMENDATION_PURGE_BATCH_SIZE = int(os.getenv("RECOMMENDATION_PURGE_BATCH_SIZE", "500"))
+PRODUCT_SNAPSHOT_REFRESH_SECONDS = float(os.getenv("PRODUCT_SNAPSHOT_REFRESH_SECONDS", "21600"))
+
+# Keeps a reference to running jobs so they are not garbage-collected mid-flight.
+_background_tasks: Set[asyncio.Task] = set()
+
+def _backfill_review_sentiments() -> int:
+    with SessionLocal() as db:
+        return crud.backfill_review_sentiments(db)
+
+async def backfill_review_sentiments() -> None:
+    """Labels reviews written before sentiment was stored, or by an older lexicon version."""
+    try:
+        updated = await asyncio.to_thread(_backfill_review_sentiments)
+    except Exception as e:
+        print(f"Review sentiment backfill failed: {e}")
+        return
+    if updated:
+        print(f"Backfilled sentiment labels for {updated} review(s)")
+
+def _purge_expired_recommendations() -> Tuple[int, int]:
+    with SessionLocal() as db:
+        return crud.purge_expired_recommendations(
+            db, retention_days=RECOMMENDATION_RETENTION_DAYS, batch_size=RECOMMENDATION_PURGE_BATCH_SIZE
+        )
+
+async def purge_expired_recommendations() -> None:
+    """Periodically deletes recommendations past their retention window."""
+    while True:
+        try:
+            recommendations, links = await asyncio.to_thread(_purge_expired_recommendations)
+        except Exception as e:
+            print(f"Expired recommendation purge failed: {e}")
+        else:
+            if recommendations or links:
+                print(f"Purged {recommendations} expired recommendation(s) and {links} product link(s)")
+        await asyncio.sleep(RECOMMENDATION_PURGE_INTERVAL_SECONDS)
+
+def _refresh_product_snapshots() -> int:
+    with SessionLocal() as db:
+        return crud.refresh_product_snapshots(db)
+
+async def refresh_product_snapshots() -> None:
+    """Periodically refreshes the local product title snapshot used by analytics, starting one
+    interval after startup (run `python -m app.cli refresh-product-snapshots` for an immediate one)."""
+    while True:
+        await asyncio.sleep(PRODUCT_SNAPSHOT_REFRESH_SECONDS)
+        try:
+            refreshed = await asyncio.to_thread(_refresh_product_snapshots)
+        except Exception as e:
+            print(f"Product snapshot refresh failed: {e}")
+        else:
+            if refreshed:
+                print(f"Refreshed {refreshed} product snapshot(s)")
+
+async def check_replica_health() -> None:
+    """Periodically pings the read replicas so unreachable ones stop receiving reads."""
+    while True:
+        await asyncio.sleep(REPLICA_HEALTH_CHECK_SECONDS)
+        await replica_router.check_health()
+
+def start_background_tasks() -> None:
+    jobs = [backfill_review_sentiments(), purge_expired_recommendations(), refresh_product_snapshots()]
+    if replica_router.engines:
+        jobs.append(check_replica_health())
+    for job in jobs:
+        task = asyncio.create_task(job)
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+async def stop_background_tasks() -> None:
+    for task in list(_background_tasks):
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
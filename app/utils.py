@@ -1,23 +1,221 @@
 
+import os
+import random
+import threading
+import time
 import requests
-from typing import Optional
-from .schemas import ProductDetail 
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from . import metrics
+from .cache import MISSING, TTLCache
+from .circuit_breaker import CircuitBreaker
+from .schemas import ProductDetail
 
-DUMMY_API_URL = "https://fakestoreapi.com/products" 
+DUMMY_API_URL = os.getenv("PRODUCT_API_URL", "https://fakestoreapi.com/products")
+PRODUCT_API_TIMEOUT_SECONDS = float(os.getenv("PRODUCT_API_TIMEOUT_SECONDS", "3"))
+PRODUCT_API_DEADLINE_SECONDS = float(os.getenv("PRODUCT_API_DEADLINE_SECONDS", "5"))
+PRODUCT_API_MAX_WORKERS = int(os.getenv("PRODUCT_API_MAX_WORKERS", "10"))
+# Retries after a connection error, timeout or 5xx, with full-jitter exponential backoff.
+PRODUCT_API_RETRIES = int(os.getenv("PRODUCT_API_RETRIES", "2"))
+PRODUCT_API_RETRY_BACKOFF_SECONDS = float(os.getenv("PRODUCT_API_RETRY_BACKOFF_SECONDS", "0.1"))
+# Consecutive failed lookups that open the circuit, and how long it stays open before a trial call.
+PRODUCT_API_BREAKER_THRESHOLD = int(os.getenv("PRODUCT_API_BREAKER_THRESHOLD", "5"))
+PRODUCT_API_BREAKER_RESET_SECONDS = float(os.getenv("PRODUCT_API_BREAKER_RESET_SECONDS", "30"))
+PRODUCT_CACHE_MAX_ENTRIES = int(os.getenv("PRODUCT_CACHE_MAX_ENTRIES", "1024"))
+PRODUCT_CACHE_TTL_SECONDS = float(os.getenv("PRODUCT_CACHE_TTL_SECONDS", "3600"))
+PRODUCT_CACHE_NOT_FOUND_TTL_SECONDS = float(os.getenv("PRODUCT_CACHE_NOT_FOUND_TTL_SECONDS", "300"))
+# How long the last good copy of a product may be served once it is no longer fresh, while it
+# is revalidated in the background or the catalog is failing.
+PRODUCT_STALE_TTL_SECONDS = float(os.getenv("PRODUCT_STALE_TTL_SECONDS", "86400"))
 
-def fetch_product_details_by_id(product_id: int) -> Optional[ProductDetail]:
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# One pooled session shared by every worker so connections to the catalog are kept alive.
+_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=PRODUCT_API_MAX_WORKERS)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+
+_executor = ThreadPoolExecutor(max_workers=PRODUCT_API_MAX_WORKERS, thread_name_prefix="product-catalog")
+
+_product_cache = TTLCache(maxsize=PRODUCT_CACHE_MAX_ENTRIES, ttl_seconds=PRODUCT_CACHE_TTL_SECONDS)
+_last_good_products = TTLCache(maxsize=PRODUCT_CACHE_MAX_ENTRIES, ttl_seconds=PRODUCT_STALE_TTL_SECONDS)
+_breaker = CircuitBreaker(PRODUCT_API_BREAKER_THRESHOLD, PRODUCT_API_BREAKER_RESET_SECONDS)
+_inflight: Dict[int, Future] = {}
+_inflight_lock = threading.Lock()
+_coalesced_requests = 0
+_client_counters: Counter = Counter()
+_client_counters_lock = threading.Lock()
+
+def _count(name: str) -> None:
+    with _client_counters_lock:
+        _client_counters[name] += 1
+
+def _request_product(product_id: int) -> Tuple[Optional[ProductDetail], bool]:
     """
-    Fetches product details for a given product_id from the fakestoreapi.
-    Returns a ProductDetail Pydantic model instance or None if an error occurs.
+    Calls the catalog API, retrying transient failures. Returns (product, not_found); product is
+    None on any failure. Fails fast without a call while the circuit breaker is open.
     """
+    if not _breaker.allow():
+        _count("short_circuited")
+        return None, False
+    error: Optional[str] = None
+    for attempt in range(PRODUCT_API_RETRIES + 1):
+        if attempt:
+            _count("retries")
+            time.sleep(random.uniform(0, PRODUCT_API_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)))
+        started = time.perf_counter()
+        try:
+            response = _session.get(f"{DUMMY_API_URL}/{product_id}", timeout=PRODUCT_API_TIMEOUT_SECONDS)
+        except requests.exceptions.Timeout as e:
+            metrics.CATALOG_REQUEST_DURATION.labels("timeout").observe(time.perf_counter() - started)
+            error = str(e)
+            continue
+        except requests.exceptions.RequestException as e:
+            metrics.CATALOG_REQUEST_DURATION.labels("error").observe(time.perf_counter() - started)
+            error = str(e)
+            if isinstance(e, requests.exceptions.ConnectionError):
+                continue
+            break
+        elapsed = time.perf_counter() - started
+        if response.status_code == 404:
+            metrics.CATALOG_REQUEST_DURATION.labels("not_found").observe(elapsed)
+            _breaker.record_success()
+            return None, True
+        if not response.ok:
+            metrics.CATALOG_REQUEST_DURATION.labels("error").observe(elapsed)
+            error = f"HTTP {response.status_code}"
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                continue
+            break
+        metrics.CATALOG_REQUEST_DURATION.labels("ok").observe(elapsed)
+        try:
+            product = ProductDetail(**response.json())
+            _breaker.record_success()
+            return product, False
+        except Exception as e:
+            print(f"Error processing product data for product {product_id}: {e}")
+            error = None
+            break
+    if error is not None:
+        print(f"Error fetching product {product_id} from API: {error}")
+    _count("failures")
+    _breaker.record_failure()
+    return None, False
+
+def _store_product(product_id: int, product: Optional[ProductDetail], not_found: bool) -> None:
+    if product is not None:
+        _product_cache.set(product_id, product)
+        _last_good_products.set(product_id, product)
+    elif not_found:
+        _product_cache.set(product_id, None, ttl_seconds=PRODUCT_CACHE_NOT_FOUND_TTL_SECONDS)
+        _last_good_products.delete(product_id)
+
+def _load_product(product_id: int) -> Optional[ProductDetail]:
+    """Fetches a product and updates the caches; concurrent loads of one id share a single call."""
+    global _coalesced_requests
+    with _inflight_lock:
+        future = _inflight.get(product_id)
+        is_leader = future is None
+        if is_leader:
+            future = Future()
+            _inflight[product_id] = future
+        else:
+            _coalesced_requests += 1
+    if not is_leader:
+        return future.result()
+
+    product: Optional[ProductDetail] = None
     try:
-        response = requests.get(f"{DUMMY_API_URL}/{product_id}")
-        response.raise_for_status()  
-        product_data = response.json()
-        return ProductDetail(**product_data)
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching product {product_id} from API: {e}")
-        return None
-    except Exception as e:
-        print(f"Error processing product data for product {product_id}: {e}")
-        return None
\ No newline at end of file
+        product, not_found = _request_product(product_id)
+        _store_product(product_id, product, not_found)
+        if product is None and not not_found:
+            # The catalog is failing: fall back to the last good copy, if any.
+            stale = _last_good_products.get(product_id)
+            if stale is not MISSING:
+                _count("stale_served")
+                product = stale
+    finally:
+        with _inflight_lock:
+            _inflight.pop(product_id, None)
+        future.set_result(product)
+    return product
+
+def _fetch_fresh_product(product_id: int) -> Optional[ProductDetail]:
+    product, not_found = _request_product(product_id)
+    _store_product(product_id, product, not_found)
+    return product
+
+def _revalidate_in_background(product_id: int) -> None:
+    with _inflight_lock:
+        if product_id in _inflight:
+            return
+    _count("revalidations")
+    _executor.submit(_load_product, product_id)
+
+def product_cache_stats() -> Dict[str, int]:
+    """Hit/miss/eviction counters of the product cache, plus requests coalesced onto an in-flight fetch."""
+    stats = _product_cache.stats()
+    stats["coalesced"] = _coalesced_requests
+    return stats
+
+def catalog_client_stats() -> Dict[str, object]:
+    """Circuit breaker state and resilience counters of the catalog client, with cache stats."""
+    with _client_counters_lock:
+        counters = {name: _client_counters[name] for name in ("retries", "failures", "short_circuited", "stale_served", "revalidations")}
+    return {"breaker": _breaker.stats(), **counters, "cache": product_cache_stats()}
+
+def fetch_products_by_ids(product_ids: Iterable[int]) -> Dict[int, Optional[ProductDetail]]:
+    """
+    Batched catalog lookup: returns {product_id: ProductDetail or None} for the distinct ids given.
+    Fresh cache entries (404s are cached for a shorter time) are answered immediately. Once an
+    entry expires its last good copy is returned and refreshed in the background
+    (stale-while-revalidate); it is also served while the catalog is failing. The remaining ids
+    are fetched concurrently, with concurrent misses for one id sharing a single request, bounded
+    by PRODUCT_API_DEADLINE_SECONDS overall. Ids that failed or missed the deadline map to None.
+    """
+    results: Dict[int, Optional[ProductDetail]] = {}
+    pending: Dict[int, Future] = {}
+    for product_id in dict.fromkeys(product_ids):
+        cached = _product_cache.get(product_id)
+        if cached is MISSING:
+            cached = _last_good_products.get(product_id)
+            if cached is not MISSING:
+                _count("stale_served")
+                _revalidate_in_background(product_id)
+        if cached is not MISSING:
+            results[product_id] = cached
+        else:
+            pending[product_id] = _executor.submit(_load_product, product_id)
+    return _collect(pending, results)
+
+def fetch_fresh_products_by_ids(product_ids: Iterable[int]) -> Dict[int, Optional[ProductDetail]]:
+    """
+    Like fetch_products_by_ids, but asks the catalog for every id and never answers from the cache
+    or with a stale copy: ids the catalog did not return map to None. Fresh results still update
+    the cache.
+    """
+    pending = {product_id: _executor.submit(_fetch_fresh_product, product_id) for product_id in dict.fromkeys(product_ids)}
+    return _collect(pending, {})
+
+def _collect(pending: Dict[int, Future], results: Dict[int, Optional[ProductDetail]]) -> Dict[int, Optional[ProductDetail]]:
+    """Adds the pending fetches to results, bounded by PRODUCT_API_DEADLINE_SECONDS overall."""
+    if not pending:
+        return results
+
+    done, _ = wait(pending.values(), timeout=PRODUCT_API_DEADLINE_SECONDS)
+    for product_id, future in pending.items():
+        if future in done:
+            results[product_id] = future.result()
+        else:
+            future.cancel()
+            print(f"Timed out fetching product {product_id} from API")
+            results[product_id] = None
+    return results
+
+def fetch_products_details(product_ids: Sequence[int]) -> List[Optional[ProductDetail]]:
+    """Like fetch_products_by_ids, but returns one entry per id in product_ids, in order."""
+    products = fetch_products_by_ids(product_ids)
+    return [products[product_id] for product_id in product_ids]
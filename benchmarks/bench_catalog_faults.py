@@ -0,0 +1,68 @@
+"""
+Exercises the product catalog client against the fault-injecting stub catalog and reports, per
+scenario, how many lookups returned data, how long batches took and the client's breaker/retry
+counters:
+
+    python -m benchmarks.bench_catalog_faults
+
+Scenarios: healthy, flaky (30% of calls fail with 503), outage (every call fails; previously seen
+products must still be served from stale data and the breaker must open), hang (calls stall past
+the client timeout) and recovery (faults cleared, breaker closes after its reset timeout).
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks.stub_catalog import set_faults, start_stub_catalog, stub_catalog_url
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    catalog = start_stub_catalog(latency_ms=5, product_count=args.products)
+    # The client reads its settings at import time; short timeouts keep the scenarios quick.
+    os.environ.update({
+        "PRODUCT_API_URL": stub_catalog_url(catalog),
+        "PRODUCT_API_TIMEOUT_SECONDS": "0.5",
+        "PRODUCT_API_DEADLINE_SECONDS": "2",
+        "PRODUCT_CACHE_TTL_SECONDS": "0.2",
+        "PRODUCT_API_BREAKER_RESET_SECONDS": "2",
+    })
+    from app import utils
+
+    product_ids = list(range(1, args.products + 1))
+    report = {}
+
+    def scenario(name: str, **faults) -> None:
+        set_faults(catalog, **faults)
+        served_before = catalog.RequestHandlerClass.requests_served
+        returned = 0
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            time.sleep(0.25)  # let fresh entries go stale so every round exercises the catalog path
+            returned += sum(product is not None for product in utils.fetch_products_details(product_ids))
+        elapsed = time.perf_counter() - started - 0.25 * args.rounds
+        report[name] = {
+            "returned": f"{returned}/{len(product_ids) * args.rounds}",
+            "seconds_per_batch": round(elapsed / args.rounds, 3),
+            "catalog_calls": catalog.RequestHandlerClass.requests_served - served_before,
+            "client": utils.catalog_client_stats(),
+        }
+
+    scenario("healthy")
+    scenario("flaky", error_rate=0.3)
+    scenario("outage", error_rate=1.0)
+    scenario("hang", error_rate=0.0, hang_rate=1.0, hang_seconds=3)
+    set_faults(catalog, hang_rate=0.0)
+    time.sleep(utils.PRODUCT_API_BREAKER_RESET_SECONDS)
+    scenario("recovery")
+    catalog.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
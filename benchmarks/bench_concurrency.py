@@ -0,0 +1,75 @@
+"""
+Measures how throughput scales with concurrent clients on database-backed endpoints.
+
+Starts the API (and a stub product catalog with artificial latency) in the background, seeds a
+doctor with reviews and a recommendation, then drives each route at increasing concurrency:
+
+    python -m benchmarks.bench_concurrency --concurrency 1 8 32 --total 400
+
+Run it on two revisions and compare requests_per_second: handlers that block the event loop
+stay flat as concurrency grows, non-blocking ones scale.
+"""
+import argparse
+import json
+
+import requests
+
+from benchmarks.harness import api_server, auth_headers, register_and_login
+from benchmarks.loadgen import run_load
+from benchmarks.stub_catalog import start_stub_catalog, stub_catalog_url
+
+
+def seed(base_url: str) -> dict:
+    token = register_and_login(base_url, "bench_doctor")
+    headers = auth_headers(token)
+    doctor = requests.post(
+        f"{base_url}/api/v1/doctors/", json={"name": "Dr. Bench", "specialization": "Dermatology"}, headers=headers, timeout=30
+    )
+    doctor_id = doctor.json()["id"] if doctor.ok else 1
+    for rating in range(50):
+        requests.post(
+            f"{base_url}/api/v1/doctors/{doctor_id}/reviews",
+            json={"rating": rating % 5 + 1, "comment": "Great and helpful doctor"},
+            headers=headers,
+            timeout=30,
+        )
+    recommendation = requests.post(
+        f"{base_url}/api/v1/doctors/{doctor_id}/recommendations",
+        json={"notes": "bench", "products": [{"product_id": i} for i in range(1, 6)]},
+        headers=headers,
+        timeout=30,
+    ).json()
+    return {"token": token, "doctor_id": doctor_id, "recommendation_uuid": recommendation["uuid"]}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--total", type=int, default=400)
+    parser.add_argument("--catalog-latency-ms", type=float, default=50.0)
+    args = parser.parse_args(argv)
+
+    catalog = start_stub_catalog(latency_ms=args.catalog_latency_ms)
+    # A tiny product cache TTL keeps catalog latency in the public recommendation route.
+    env = {"PRODUCT_API_URL": stub_catalog_url(catalog), "PRODUCT_CACHE_TTL_SECONDS": "0.001"}
+    with api_server(env=env) as base_url:
+        data = seed(base_url)
+        headers = auth_headers(data["token"])
+        routes = {
+            "GET /api/v1/users/me": (f"{base_url}/api/v1/users/me", headers),
+            "GET /api/v1/doctors/": (f"{base_url}/api/v1/doctors/?reviews=latest", None),
+            "GET /api/v1/doctors/analytics/me": (f"{base_url}/api/v1/doctors/analytics/me", headers),
+            "GET /api/v1/recommendations/{uuid}": (f"{base_url}/api/v1/recommendations/{data['recommendation_uuid']}", None),
+        }
+        results = {}
+        for name, (url, route_headers) in routes.items():
+            results[name] = {
+                str(concurrency): run_load(url, concurrency=concurrency, total=args.total, headers=route_headers)
+                for concurrency in args.concurrency
+            }
+    catalog.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Login throughput under a burst of concurrent `POST /api/v1/auth/token` requests.
+
+While the burst runs, a probe client polls `GET /` and reports its latency: if password checks
+run on the event loop the probe stalls behind every bcrypt call, if they run in the worker pool
+it stays flat.
+
+    python -m benchmarks.bench_login --concurrency 32 --total 200 --rounds 12
+"""
+import argparse
+import json
+import threading
+
+from benchmarks.harness import api_server, register_and_login
+from benchmarks.loadgen import run_load
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--total", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS for the server under test.")
+    parser.add_argument("--workers", type=int, help="PASSWORD_HASH_WORKERS for the server under test.")
+    args = parser.parse_args(argv)
+
+    env = {"BCRYPT_ROUNDS": str(args.rounds), "PASSWORD_HASH_MAX_PENDING": str(args.concurrency * 2)}
+    if args.workers:
+        env["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    with api_server(env=env) as base_url:
+        password = "benchmark-password"
+        register_and_login(base_url, "bench_login", password)
+        login = {}
+
+        def burst() -> None:
+            login.update(run_load(
+                f"{base_url}/api/v1/auth/token",
+                concurrency=args.concurrency,
+                total=args.total,
+                method="POST",
+                form_body={"username": "bench_login", "password": password},
+            ))
+
+        thread = threading.Thread(target=burst)
+        thread.start()
+        probe = run_load(f"{base_url}/", concurrency=1, total=50)
+        thread.join()
+    print(json.dumps({"login": login, "probe_during_burst": probe}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
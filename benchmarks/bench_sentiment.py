@@ -0,0 +1,162 @@
+"""
+Regression check and micro-benchmark for the review sentiment analyzer.
+
+Compares app.sentiment.SentimentAnalyzer (a single Aho-Corasick pass per text) with the original
+analyzer, with one `in` scan per distinct keyword and with a single-pass lookahead-alternation
+regex on synthetic corpora, fails if any label differs, and prints timings:
+
+    python -m benchmarks.bench_sentiment --comments 100000
+"""
+import argparse
+import json
+import random
+import re
+import time
+from collections import Counter
+from typing import Callable, List, Optional
+
+from app.sentiment import NEGATIVE_KEYWORDS, POSITIVE_KEYWORDS, SentimentAnalyzer
+
+FILLER_WORDS = (
+    "the doctor was very kind and explained everything clearly but waiting time long clinic "
+    "clean staff friendly skin improved after weeks treatment acne cream prescribed follow up"
+).split()
+
+
+def legacy_sentiment_analyzer(text: str) -> str:
+    """The analyzer as originally written in crud.py, kept as the reference implementation."""
+    if not text:
+        return "neutral"
+    text_lower = text.lower()
+
+    positive_keywords = ["good", "great", "excellent", "fantastic", "helpful", "positive", "love", "best", "amazing", "satisfied", "recommend", "pleased", "impressed", "wonderful", "effective"]
+    negative_keywords = ["bad", "poor", "terrible", "awful", "negative", "hate", "worst", "avoid", "disappointed", "unhelpful", "rush", "problem", "issue", "concern", "not good"]
+
+    positive_score = sum(1 for keyword in positive_keywords if keyword in text_lower)
+    negative_score = sum(1 for keyword in negative_keywords if keyword in text_lower)
+
+    if positive_score > negative_score:
+        return "positive"
+    elif negative_score > positive_score:
+        return "negative"
+    else:
+        return "neutral"
+
+
+def keyword_scan_analyzer(analyzer: SentimentAnalyzer) -> Callable[[Optional[str]], str]:
+    """The legacy scoring with the lexicon netted once: one `in` substring search per keyword."""
+    weights = Counter(analyzer.positive_keywords)
+    weights.subtract(Counter(analyzer.negative_keywords))
+    pairs = tuple((keyword, weight) for keyword, weight in weights.items() if weight)
+
+    def label(text: Optional[str]) -> str:
+        if not text:
+            return "neutral"
+        text_lower = text.lower()
+        score = sum(weight for keyword, weight in pairs if keyword in text_lower)
+        return "positive" if score > 0 else "negative" if score < 0 else "neutral"
+    return label
+
+
+def lookahead_regex_analyzer(analyzer: SentimentAnalyzer) -> Callable[[Optional[str]], str]:
+    """
+    The single-pass alternative: one lookahead alternation `(?=(kw1|kw2|...))` reports the
+    keyword starting at every position in a single findall. Keywords are tried longest first and
+    a match also credits the shorter keywords it starts with, so overlaps score like `in`.
+    """
+    weights = Counter(analyzer.positive_keywords)
+    weights.subtract(Counter(analyzer.negative_keywords))
+    keywords = sorted(weights, key=len, reverse=True)
+    pattern = re.compile("(?=(" + "|".join(re.escape(keyword) for keyword in keywords) + "))")
+    credited = {keyword: [other for other in keywords if keyword.startswith(other)] for keyword in keywords}
+
+    def label(text: Optional[str]) -> str:
+        if not text:
+            return "neutral"
+        matched = set()
+        for keyword in set(pattern.findall(text.lower())):
+            matched.update(credited[keyword])
+        score = sum(weights[keyword] for keyword in matched)
+        return "positive" if score > 0 else "negative" if score < 0 else "neutral"
+    return label
+
+
+STOCK_REVIEWS = ("Great doctor", "Very helpful", "Bad experience", "ok", "Excellent care, highly recommend", "Long wait")
+
+
+def make_corpus(
+    size: int, keyword_ratio: float, max_words: int, seed: int = 7, stock_ratio: float = 0.0
+) -> List[Optional[str]]:
+    rng = random.Random(seed)
+    keywords = POSITIVE_KEYWORDS + NEGATIVE_KEYWORDS
+    corpus: List[Optional[str]] = []
+    for _ in range(size):
+        if rng.random() < stock_ratio:
+            corpus.append(rng.choice(STOCK_REVIEWS))
+            continue
+        words = [
+            rng.choice(keywords) if rng.random() < keyword_ratio else rng.choice(FILLER_WORDS)
+            for _ in range(rng.randint(1, max_words))
+        ]
+        if rng.random() < 0.1:
+            words = [word.upper() for word in words]
+        corpus.append(" ".join(words))
+    corpus.extend(["", None, "NOT GOOD", "unhelpful", "brushed", "goodness", "not  good"])
+    return corpus
+
+
+def timed(fn: Callable[[], List[str]]) -> tuple:
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--comments", type=int, default=100000)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args(argv)
+
+    analyzer = SentimentAnalyzer()
+    scan_label = keyword_scan_analyzer(analyzer)
+    regex_label = lookahead_regex_analyzer(analyzer)
+    results = {}
+    corpora = (
+        ("typical", dict(keyword_ratio=0.05, max_words=25)),
+        ("keyword_dense", dict(keyword_ratio=0.2, max_words=60)),
+        ("long_sparse", dict(keyword_ratio=0.02, max_words=120)),
+        ("with_repeats", dict(keyword_ratio=0.05, max_words=25, stock_ratio=0.4)),
+    )
+    for name, options in corpora:
+        corpus = make_corpus(args.comments, **options)
+        expected, legacy_seconds = timed(lambda: [legacy_sentiment_analyzer(text) for text in corpus])
+        single, single_seconds = timed(lambda: [analyzer.label(text) for text in corpus])
+        batch, batch_seconds = timed(lambda: analyzer.label_many(corpus))
+        scan, scan_seconds = timed(lambda: [scan_label(text) for text in corpus])
+        regex, regex_seconds = timed(lambda: [regex_label(text) for text in corpus])
+        if single != expected or batch != expected or scan != expected or regex != expected:
+            raise SystemExit(f"{name}: labels differ from the legacy analyzer")
+        results[name] = {
+            "comments": len(corpus),
+            "legacy_seconds": round(legacy_seconds, 4),
+            "label_seconds": round(single_seconds, 4),
+            "label_many_seconds": round(batch_seconds, 4),
+            "keyword_scan_seconds": round(scan_seconds, 4),
+            "lookahead_regex_seconds": round(regex_seconds, 4),
+            "label_many_speedup": round(legacy_seconds / batch_seconds, 2),
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, row in results.items():
+            print(
+                f"{name:>14}: {row['comments']} comments  legacy {row['legacy_seconds']:.3f}s  "
+                f"label {row['label_seconds']:.3f}s  label_many {row['label_many_seconds']:.3f}s  "
+                f"keyword scan {row['keyword_scan_seconds']:.3f}s  "
+                f"lookahead regex {row['lookahead_regex_seconds']:.3f}s  (label_many {row['label_many_speedup']}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Micro-benchmark of response payload building for 1000-review responses: a doctor with all its
+reviews embedded (GET /api/v1/doctors/{id}) and a page of reviews. Compares
+
+  response_model  what the handlers used to do: ReviewOut.model_validate per review into a
+                  DoctorOut, then FastAPI's response_model validation and JSON serialization
+  fast            app.serialization: plain dicts from the ORM rows, encoded once with orjson
+
+plus gzip of the fast payload at the API's compression level. Fails if the two paths produce
+different JSON.
+
+    python -m benchmarks.bench_serialization --reviews 1000 --iterations 200
+"""
+import argparse
+import json
+import tempfile
+import zlib
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_suite import time_calls
+from benchmarks.seed import seed_dataset
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reviews", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args(argv)
+
+    from app import crud, schemas, serialization
+    from app.main import GZIP_COMPRESSION_LEVEL
+
+    # What FastAPI runs for response_model=DoctorOut / List[ReviewOut].
+    doctor_adapter = TypeAdapter(schemas.DoctorOut)
+    reviews_adapter = TypeAdapter(List[schemas.ReviewOut])
+
+    def response_model_doctor(doctor) -> bytes:
+        doctor_out = schemas.DoctorOut(
+            id=doctor.id,
+            name=doctor.name,
+            specialization=doctor.specialization,
+            average_rating=doctor.average_rating,
+            reviews=[schemas.ReviewOut.model_validate(review) for review in doctor.reviews]
+        )
+        return doctor_adapter.dump_json(doctor_adapter.validate_python(doctor_out, from_attributes=True))
+
+    def response_model_reviews(reviews) -> bytes:
+        return reviews_adapter.dump_json(reviews_adapter.validate_python(reviews, from_attributes=True))
+
+    def fast_doctor(doctor) -> bytes:
+        return serialization.FastJSONResponse(serialization.doctor_payload(doctor, doctor.reviews)).body
+
+    def fast_reviews(reviews) -> bytes:
+        return serialization.FastJSONResponse([serialization.review_payload(review) for review in reviews]).body
+
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = f"sqlite:///{workdir}/bench.db"
+        dataset = seed_dataset(database_url, doctors=1, reviews=args.reviews, recommendations=0)
+        engine = create_engine(database_url)
+        db = sessionmaker(bind=engine)()
+        try:
+            doctor = crud.get_doctor(db, dataset["doctor_ids"][0])
+            reviews = list(doctor.reviews)
+            cases = {
+                f"doctor_with_{len(reviews)}_reviews": (doctor, response_model_doctor, fast_doctor),
+                f"review_list_{len(reviews)}": (reviews, response_model_reviews, fast_reviews),
+            }
+            results = {}
+            for name, (rows, slow, fast) in cases.items():
+                body = fast(rows)
+                if json.loads(slow(rows)) != json.loads(body):
+                    raise SystemExit(f"{name}: the fast payload differs from the response_model one")
+                gzipped = zlib.compress(body, GZIP_COMPRESSION_LEVEL)
+                results[name] = {
+                    "response_model": time_calls(lambda: slow(rows), args.iterations),
+                    "fast": time_calls(lambda: fast(rows), args.iterations),
+                    "gzip": time_calls(lambda: zlib.compress(body, GZIP_COMPRESSION_LEVEL), args.iterations),
+                    "bytes": len(body),
+                    "gzip_bytes": len(gzipped),
+                }
+        finally:
+            db.close()
+            engine.dispose()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, row in results.items():
+            slow_ms, fast_ms = row["response_model"]["p50_ms"], row["fast"]["p50_ms"]
+            print(
+                f"{name}: response_model p50 {slow_ms:.2f} ms  fast p50 {fast_ms:.2f} ms "
+                f"({slow_ms / fast_ms:.1f}x)  gzip p50 {row['gzip']['p50_ms']:.2f} ms, "
+                f"{row['bytes']} -> {row['gzip_bytes']} bytes"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Compares the SQLite profiles (SQLITE_PROFILE=default vs production) under a mixed workload:
+concurrent review writers and, at the same time, concurrent readers of the doctor and review
+endpoints. Each profile gets its own freshly seeded database file:
+
+    python -m benchmarks.bench_sqlite_profile --writers 16 --readers 16 --total 1000
+
+With the default profile, writers contend in SQLite's busy handler (errors are "database is
+locked" failures once it gives up) and readers wait behind them; the production profile (WAL,
+tuned pragmas, queued writes) should show no errors and better read throughput and latency.
+"""
+import argparse
+import json
+import tempfile
+import threading
+
+import requests
+
+from benchmarks.harness import api_server, auth_headers
+from benchmarks.loadgen import run_load
+from benchmarks.seed import SEED_PASSWORD, seed_dataset
+from benchmarks.stub_catalog import start_stub_catalog, stub_catalog_url
+
+
+def run_mixed(base_url: str, dataset: dict, writers: int, readers: int, total: int) -> dict:
+    token = requests.post(
+        f"{base_url}/api/v1/auth/token",
+        data={"username": dataset["doctor_usernames"][0], "password": SEED_PASSWORD},
+        timeout=30,
+    ).json()["access_token"]
+    doctor_id = dataset["doctor_ids"][0]
+    results = {}
+
+    def write() -> None:
+        results["POST /api/v1/doctors/{doctor_id}/reviews"] = run_load(
+            f"{base_url}/api/v1/doctors/{doctor_id}/reviews",
+            concurrency=writers,
+            total=total,
+            method="POST",
+            headers=auth_headers(token),
+            json_body={"rating": 5, "comment": "Excellent and helpful"},
+            expected_status=201,
+        )
+
+    def read(name: str, url: str) -> None:
+        results[name] = run_load(url, concurrency=readers, total=total)
+
+    threads = [
+        threading.Thread(target=write),
+        threading.Thread(target=read, args=("GET /api/v1/doctors/{doctor_id}", f"{base_url}/api/v1/doctors/{doctor_id}?reviews=latest")),
+        threading.Thread(target=read, args=("GET /api/v1/doctors/{doctor_id}/reviews", f"{base_url}/api/v1/doctors/{doctor_id}/reviews")),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--total", type=int, default=1000, help="Requests per route.")
+    parser.add_argument("--reviews", type=int, default=5000, help="Reviews seeded before the run.")
+    args = parser.parse_args(argv)
+
+    catalog = start_stub_catalog()
+    report = {}
+    try:
+        for profile in ("default", "production"):
+            with tempfile.TemporaryDirectory() as workdir:
+                database_url = f"sqlite:///{workdir}/bench.db"
+                dataset = seed_dataset(database_url, doctors=10, reviews=args.reviews, recommendations=100)
+                env = {"SQLITE_PROFILE": profile, "PRODUCT_API_URL": stub_catalog_url(catalog)}
+                with api_server(env=env, database_url=database_url) as base_url:
+                    report[profile] = run_mixed(base_url, dataset, args.writers, args.readers, args.total)
+    finally:
+        catalog.shutdown()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Reproducible benchmark suite: seeds a synthetic dataset, starts the API against it with a local
+stub product catalog, drives each route with the closed-loop load generator and runs
+micro-benchmarks of the sentiment analyzer and rating trend queries. Results are written as JSON:
+
+    python -m benchmarks.bench_suite --doctors 50 --reviews 20000 --recommendations 2000 --output before.json
+    # ...change the code, then
+    python -m benchmarks.bench_suite --output after.json
+    python -m benchmarks.compare before.json after.json
+
+Every run uses the same seed, dataset sizes and request mix unless told otherwise, so two result
+files taken on the same machine are directly comparable.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+import requests
+
+from benchmarks.harness import REPO_ROOT, api_server, auth_headers
+from benchmarks.loadgen import run_load, summarize
+from benchmarks.seed import SEED_PASSWORD, seed_dataset
+from benchmarks.stub_catalog import start_stub_catalog, stub_catalog_url
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def time_calls(fn: Callable[[], object], iterations: int) -> Dict[str, float]:
+    """Calls fn back to back and reports per-call latency percentiles, like run_load does for HTTP."""
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - call_started)
+    return summarize(latencies, 0, time.perf_counter() - started)
+
+
+def run_micro_benchmarks(database_url: str, doctor_id: int, iterations: int) -> Dict[str, Dict[str, float]]:
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import sessionmaker
+
+    from app import crud, models
+
+    engine = create_engine(database_url)
+    db = sessionmaker(bind=engine)()
+    try:
+        comments = db.scalars(select(models.Review.comment).limit(1000)).all()
+        results = {
+            # Per call: label every comment of a 1000-review page, as the sentiment backfill does.
+            "sentiment_analyzer_1000_comments": time_calls(
+                lambda: [crud._simple_sentiment_analyzer(comment) for comment in comments], iterations
+            ),
+            "calculate_rating_trends": time_calls(lambda: crud.calculate_rating_trends(db, doctor_id), iterations),
+            "get_rollup_rating_trends": time_calls(lambda: crud.get_rollup_rating_trends(db, doctor_id), iterations),
+        }
+    finally:
+        db.close()
+        engine.dispose()
+    return results
+
+
+def run_http_benchmarks(base_url: str, dataset: dict, concurrency: int, total: int) -> Dict[str, Dict[str, float]]:
+    token = requests.post(
+        f"{base_url}/api/v1/auth/token",
+        data={"username": dataset["doctor_usernames"][0], "password": SEED_PASSWORD},
+        timeout=30,
+    ).json()["access_token"]
+    headers = auth_headers(token)
+    doctor_id = dataset["doctor_ids"][0]
+    recommendation_uuid = dataset["recommendation_uuids"][0]
+    routes = {
+        "GET /api/v1/users/me": dict(url=f"{base_url}/api/v1/users/me", headers=headers),
+        "GET /api/v1/doctors/": dict(url=f"{base_url}/api/v1/doctors/?limit=10&reviews=latest"),
+        "GET /api/v1/doctors/{doctor_id}": dict(url=f"{base_url}/api/v1/doctors/{doctor_id}?reviews=latest"),
+        "GET /api/v1/doctors/{doctor_id}/reviews": dict(url=f"{base_url}/api/v1/doctors/{doctor_id}/reviews"),
+        "GET /api/v1/doctors/analytics/me": dict(url=f"{base_url}/api/v1/doctors/analytics/me", headers=headers),
+        "GET /api/v1/recommendations/{uuid}": dict(url=f"{base_url}/api/v1/recommendations/{recommendation_uuid}"),
+        "POST /api/v1/doctors/{doctor_id}/reviews": dict(
+            url=f"{base_url}/api/v1/doctors/{doctor_id}/reviews",
+            method="POST",
+            headers=headers,
+            json_body={"rating": 4, "comment": "Great and helpful doctor, would recommend"},
+            expected_status=201,
+        ),
+    }
+    return {
+        name: run_load(concurrency=concurrency, total=total, **options)
+        for name, options in routes.items()
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--reviews", type=int, default=20000)
+    parser.add_argument("--recommendations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--total", type=int, default=500, help="Requests per route.")
+    parser.add_argument("--iterations", type=int, default=200, help="Calls per micro-benchmark.")
+    parser.add_argument("--catalog-latency-ms", type=float, default=20.0)
+    parser.add_argument("--output", help="Write the results to this file as well as stdout.")
+    args = parser.parse_args(argv)
+
+    started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    with tempfile.TemporaryDirectory() as workdir:
+        database_url = f"sqlite:///{workdir}/bench.db"
+        seed_started = time.perf_counter()
+        dataset = seed_dataset(database_url, args.doctors, args.reviews, args.recommendations, seed=args.seed)
+        seed_seconds = time.perf_counter() - seed_started
+
+        micro = run_micro_benchmarks(database_url, dataset["doctor_ids"][0], args.iterations)
+
+        catalog = start_stub_catalog(latency_ms=args.catalog_latency_ms)
+        try:
+            with api_server(env={"PRODUCT_API_URL": stub_catalog_url(catalog)}, database_url=database_url) as base_url:
+                http = run_http_benchmarks(base_url, dataset, args.concurrency, args.total)
+        finally:
+            catalog.shutdown()
+
+    report = {
+        "meta": {
+            "started_at": started_at,
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "parameters": {name: value for name, value in vars(args).items() if name != "output"},
+            "seed_seconds": round(seed_seconds, 3),
+        },
+        "http": http,
+        "micro": micro,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Compares two result files from benchmarks.bench_suite and flags regressions:
+
+    python -m benchmarks.compare before.json after.json --threshold 0.10
+
+For every HTTP route and micro-benchmark present in both files, prints p50/p95/p99 latency and
+throughput side by side. Exits with status 1 if any p95 latency grew, or throughput fell, by more
+than the threshold (a fraction), so it can gate a CI job.
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Tuple
+
+COMPARED_METRICS = (
+    # (metric, True if a larger value is better)
+    ("p50_ms", False),
+    ("p95_ms", False),
+    ("p99_ms", False),
+    ("requests_per_second", True),
+)
+# Only these metrics decide regressions; p50 and p99 are shown for context but are noisier.
+GATING_METRICS = ("p95_ms", "requests_per_second")
+
+
+def relative_change(before: float, after: float) -> float:
+    if before == 0:
+        return 0.0 if after == 0 else float("inf")
+    return (after - before) / before
+
+
+def compare_reports(before: dict, after: dict, threshold: float) -> Tuple[List[str], List[str]]:
+    """Returns the table lines and the descriptions of any regressions beyond threshold."""
+    lines = [f"{'benchmark':<48} {'metric':<20} {'before':>10} {'after':>10} {'change':>8}"]
+    regressions = []
+    for section in ("http", "micro"):
+        before_section: Dict[str, dict] = before.get(section, {})
+        after_section: Dict[str, dict] = after.get(section, {})
+        for name in [name for name in before_section if name in after_section]:
+            for metric, higher_is_better in COMPARED_METRICS:
+                old, new = before_section[name][metric], after_section[name][metric]
+                change = relative_change(old, new)
+                worse = -change if higher_is_better else change
+                flag = ""
+                if metric in GATING_METRICS and worse > threshold:
+                    flag = "  REGRESSION"
+                    regressions.append(f"{name} {metric}: {old} -> {new}")
+                lines.append(f"{name:<48} {metric:<20} {old:>10} {new:>10} {change:>+8.1%}{flag}")
+        for name in sorted(before_section.keys() ^ after_section.keys()):
+            lines.append(f"{name:<48} (only in {'before' if name in before_section else 'after'})")
+    return lines, regressions
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    if before["meta"]["parameters"] != after["meta"]["parameters"]:
+        print("warning: the runs used different parameters; the comparison may not be meaningful")
+
+    lines, regressions = compare_reports(before, after, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        print("\n".join(f"  {regression}" for regression in regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Helpers for benchmarks that run the API in a subprocess against a throwaway database."""
+import contextlib
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import requests
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextlib.contextmanager
+def api_server(env: Optional[Dict[str, str]] = None, database_url: Optional[str] = None) -> Iterator[str]:
+    """Starts `uvicorn app.main:app` on a free port and yields its base URL. Unless database_url
+    is given, the server gets a fresh SQLite file in a temporary directory."""
+    with tempfile.TemporaryDirectory() as workdir:
+        port = free_port()
+        server_env = dict(os.environ)
+        server_env["DATABASE_URL"] = database_url or f"sqlite:///{workdir}/bench.db"
+        server_env.update(env or {})
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=REPO_ROOT,
+            env=server_env,
+        )
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    requests.get(base_url + "/", timeout=1)
+                    break
+                except requests.RequestException:
+                    if process.poll() is not None or time.monotonic() > deadline:
+                        raise RuntimeError("API server did not start")
+                    time.sleep(0.2)
+            yield base_url
+        finally:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+def register_and_login(base_url: str, username: str, password: str = "benchmark-password") -> str:
+    """Creates a user (ignoring 'already registered') and returns a bearer token."""
+    requests.post(f"{base_url}/api/v1/users/", json={"username": username, "password": password}, timeout=30)
+    response = requests.post(
+        f"{base_url}/api/v1/auth/token", data={"username": username, "password": password}, timeout=30
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def auth_headers(token: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
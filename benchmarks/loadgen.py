@@ -0,0 +1,98 @@
+"""
+Minimal closed-loop HTTP load generator: `concurrency` workers each send requests back to back
+until `total` requests have been made, then latency percentiles and throughput are reported.
+
+    python -m benchmarks.loadgen http://127.0.0.1:8000/api/v1/doctors/ --concurrency 32 --total 2000
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round((len(latencies) + errors) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 2) if ordered else 0.0,
+    }
+
+
+def run_load(
+    url: str,
+    concurrency: int = 16,
+    total: int = 1000,
+    method: str = "GET",
+    headers: Optional[dict] = None,
+    json_body=None,
+    form_body: Optional[dict] = None,
+    expected_status: Optional[int] = None,
+) -> Dict[str, float]:
+    """Drives `total` requests at `url` from `concurrency` threads, each with a keep-alive session."""
+    remaining = [total]
+    lock = threading.Lock()
+    latencies: List[float] = []
+    errors = [0]
+
+    def worker() -> None:
+        session = requests.Session()
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            started = time.perf_counter()
+            try:
+                response = session.request(method, url, headers=headers, json=json_body, data=form_body, timeout=60)
+                ok = response.status_code == expected_status if expected_status else response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    return summarize(latencies, errors[0], time.perf_counter() - started)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("url")
+    parser.add_argument("--method", default="GET")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--total", type=int, default=1000)
+    parser.add_argument("--token", help="Bearer token sent in the Authorization header.")
+    parser.add_argument("--json-body", help="JSON request body.")
+    args = parser.parse_args(argv)
+
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else None
+    body = json.loads(args.json_body) if args.json_body else None
+    print(json.dumps(run_load(args.url, args.concurrency, args.total, args.method, headers, body), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Seeds a database with a reproducible synthetic dataset: doctors (each with a login), patients,
+reviews spread over the last twelve months and product recommendations.
+
+    python -m benchmarks.seed sqlite:///./bench.db --doctors 50 --reviews 20000 --recommendations 2000
+
+Rows are written through the bulk crud functions, so doctor totals and analytics rollups match
+what the API would have produced. The same --seed always yields the same ratings, comments,
+products and their distribution across doctors.
+"""
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_sentiment import make_corpus
+
+SEED_PASSWORD = "benchmark-password"
+PATIENT_COUNT = 20
+SPECIALIZATIONS = ("Dermatology", "Acne", "Pediatric Dermatology", "Cosmetic Dermatology", "Mohs Surgery")
+
+
+def seed_dataset(
+    database_url: str,
+    doctors: int = 50,
+    reviews: int = 20000,
+    recommendations: int = 2000,
+    products: int = 20,
+    seed: int = 7,
+) -> Dict[str, object]:
+    """
+    Creates the tables if needed and inserts the dataset. Returns the doctor usernames (all
+    sharing SEED_PASSWORD), the doctor ids and the recommendation uuids.
+    """
+    from app import auth, crud, models, schemas
+    from app.database import Base
+
+    rng = random.Random(seed)
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        # One bcrypt hash shared by every seeded account keeps seeding fast.
+        hashed_password = auth.get_password_hash(SEED_PASSWORD)
+        doctor_usernames = [f"bench_doctor_{i}" for i in range(doctors)]
+        patient_usernames = [f"bench_patient_{i}" for i in range(PATIENT_COUNT)]
+        user_ids = db.scalars(insert(models.User).returning(models.User.id, sort_by_parameter_order=True), [
+            {"username": username, "hashed_password": hashed_password}
+            for username in doctor_usernames + patient_usernames
+        ]).all()
+        doctor_ids = db.scalars(insert(models.Doctor).returning(models.Doctor.id), [
+            {
+                "user_id": user_id,
+                "name": f"Dr. Bench {i}",
+                "specialization": rng.choice(SPECIALIZATIONS),
+                "average_rating": 0.0,
+                "rating_sum": 0,
+                "review_count": 0,
+            }
+            for i, user_id in enumerate(user_ids[:doctors])
+        ]).all()
+        patient_ids = user_ids[doctors:]
+        db.commit()
+
+        now = datetime.utcnow()
+        comments = make_corpus(reviews, keyword_ratio=0.05, max_words=25, seed=seed)
+        review_rows = [
+            {
+                "doctor_id": rng.choice(doctor_ids),
+                "user_id": rng.choice(patient_ids),
+                "rating": rng.randint(1, 5),
+                "comment": comments[i],
+                "timestamp": now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600)),
+            }
+            for i in range(reviews)
+        ]
+        for start in range(0, len(review_rows), 1000):
+            crud.create_reviews(db, review_rows[start:start + 1000])
+
+        per_doctor: Dict[int, List[schemas.RecommendationCreate]] = {}
+        for _ in range(recommendations):
+            per_doctor.setdefault(rng.choice(doctor_ids), []).append(schemas.RecommendationCreate(
+                notes="Seeded recommendation",
+                products=[{"product_id": product_id} for product_id in rng.sample(range(1, products + 1), rng.randint(1, 5))],
+            ))
+        recommendation_uuids = [
+            rec.uuid
+            for doctor_id, recs in per_doctor.items()
+            for rec in crud.create_recommendations(db, recs, doctor_id)
+        ]
+    finally:
+        db.close()
+        engine.dispose()
+    return {
+        "doctor_usernames": doctor_usernames,
+        "doctor_ids": list(doctor_ids),
+        "recommendation_uuids": recommendation_uuids,
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("database_url")
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--reviews", type=int, default=20000)
+    parser.add_argument("--recommendations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    dataset = seed_dataset(args.database_url, args.doctors, args.reviews, args.recommendations, seed=args.seed)
+    print(json.dumps({
+        "doctors": len(dataset["doctor_ids"]),
+        "reviews": args.reviews,
+        "recommendations": len(dataset["recommendation_uuids"]),
+        "password": SEED_PASSWORD,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Local stand-in for the fakestoreapi product catalog.
+
+Run it and point the API at it:
+
+    python -m benchmarks.stub_catalog --port 8081 --latency-ms 50
+    PRODUCT_API_URL=http://127.0.0.1:8081/products uvicorn app.main:app
+
+Faults can be injected at start-up (--error-rate, --hang-rate) or at runtime, to simulate an
+outage against a running API:
+
+    curl -X POST http://127.0.0.1:8081/_faults -d '{"error_rate": 1.0}'
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+PRODUCT_COUNT = 20
+
+
+def make_product(product_id: int) -> dict:
+    return {
+        "id": product_id,
+        "title": f"Stub Product {product_id}",
+        "price": round(9.99 + product_id, 2),
+        "description": f"Synthetic product {product_id} served by the local stub catalog.",
+        "category": "skincare",
+        "image": f"https://example.com/products/{product_id}.jpg",
+        "rating": {"rate": 4.2, "count": 100 + product_id},
+    }
+
+
+FAULT_SETTINGS = ("latency_seconds", "error_rate", "error_status", "hang_rate", "hang_seconds")
+
+
+class StubCatalogHandler(BaseHTTPRequestHandler):
+    latency_seconds = 0.0
+    product_count = PRODUCT_COUNT
+    # Fraction of requests answered with error_status, and fraction that stall for hang_seconds
+    # (longer than any sane client timeout) before answering normally.
+    error_rate = 0.0
+    error_status = 503
+    hang_rate = 0.0
+    hang_seconds = 30.0
+    requests_served = 0
+
+    def do_GET(self):
+        type(self).requests_served += 1
+        time.sleep(self.latency_seconds)
+        roll = random.random()
+        if roll < self.error_rate:
+            self._send_json(self.error_status, {"detail": "Injected fault"})
+            return
+        if roll < self.error_rate + self.hang_rate:
+            time.sleep(self.hang_seconds)
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+        if parts == ["products"]:
+            self._send_json(200, [make_product(i) for i in range(1, self.product_count + 1)])
+            return
+        if len(parts) == 2 and parts[0] == "products" and parts[1].isdigit():
+            product_id = int(parts[1])
+            if 1 <= product_id <= self.product_count:
+                self._send_json(200, make_product(product_id))
+                return
+        self._send_json(404, {"detail": "Not found"})
+
+    def do_POST(self):
+        if self.path != "/_faults":
+            self._send_json(404, {"detail": "Not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            settings = json.loads(self.rfile.read(length) or b"{}")
+            set_faults(type(self), **settings)
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {"detail": str(e)})
+            return
+        self._send_json(200, {name: getattr(type(self), name) for name in FAULT_SETTINGS})
+
+    def _send_json(self, status_code: int, payload) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def set_faults(handler_or_server, **settings) -> None:
+    """Changes fault settings (see FAULT_SETTINGS) of a running stub, given its server or handler class."""
+    handler = getattr(handler_or_server, "RequestHandlerClass", handler_or_server)
+    for name, value in settings.items():
+        if name not in FAULT_SETTINGS:
+            raise ValueError(f"Unknown fault setting: {name}")
+        setattr(handler, name, type(getattr(handler, name))(value))
+
+
+def start_stub_catalog(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    latency_ms: float = 0.0,
+    product_count: int = PRODUCT_COUNT,
+    error_rate: float = 0.0,
+    hang_rate: float = 0.0,
+) -> ThreadingHTTPServer:
+    """Starts the stub server on a daemon thread; port 0 picks a free port (see server.server_address)."""
+    handler = type(
+        "ConfiguredStubCatalogHandler",
+        (StubCatalogHandler,),
+        {
+            "latency_seconds": latency_ms / 1000.0,
+            "product_count": product_count,
+            "error_rate": error_rate,
+            "hang_rate": hang_rate,
+        },
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stub_catalog_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/products"
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--products", type=int, default=PRODUCT_COUNT)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503.")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraction of requests that stall for 30s.")
+    args = parser.parse_args(argv)
+
+    server = start_stub_catalog(args.host, args.port, args.latency_ms, args.products, args.error_rate, args.hang_rate)
+    print(f"Stub catalog serving {args.products} products at {stub_catalog_url(server)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()